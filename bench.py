@@ -0,0 +1,110 @@
+import copy
+import sys
+import timeit
+
+from chinesechequers import *
+from perft import perft
+from play import *
+
+
+def positions(size=7):
+    """
+    Return the fixed benchmark positions, all with white to move, as a dict from name to
+    Board: the start, a crowded midgame with the pieces in contact in the middle of the
+    board, and an endgame with both sides partly home and in each other's way.
+    """
+    start = Board.start(size)
+    if size != 7:
+        return {'start': start}
+    midgame = Board([Hex(1, 2), Hex(2, 1), Hex(2, 2), Hex(1, 3), Hex(3, 1), Hex(2, 3)],
+                    [Hex(3, 3), Hex(4, 3), Hex(3, 4), Hex(4, 2), Hex(2, 4), Hex(4, 4)],
+                    size, start.white_win, start.black_win)
+    endgame = Board([Hex(2, 4), Hex(4, 4), Hex(5, 4), Hex(5, 5), Hex(5, 6), Hex(6, 5)],
+                    [Hex(0, 0), Hex(1, 1), Hex(1, 2), Hex(2, 3), Hex(4, 6), Hex(6, 4)],
+                    size, start.white_win, start.black_win)
+    return {'start': start, 'midgame': midgame, 'endgame': endgame}
+
+
+# perft totals of the benchmark positions at depths 1 to 3, to check any new move generator against
+PERFT = {
+    'start': (10, 100, 1720),
+    'midgame': (30, 886, 30057),
+    'endgame': (28, 784, 22135),
+}
+
+
+def time_call(func, repeat=5):
+    """Return the best time in seconds of one call to func, out of repeat timing runs"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def benchmarks(board):
+    """Return a list of (name, function) pairs to time on the given position"""
+    bitboard = BitBoard.from_board(board)
+    minimax = Minimax(white=True)
+    search_board = minimax._search_board(board)
+    move = next(board.generate_all_moves(True))
+    greedy = Greedy(white=True)
+    distances = greedy._get_distances(board.size)
+
+    def make_unmake():
+        search_board.make(move)
+        search_board.unmake(move)
+
+    return [
+        ("Board.generate_all_moves", lambda: list(board.generate_all_moves(True))),
+        ("BitBoard.generate_all_moves", lambda: list(bitboard.generate_all_moves(True))),
+        ("SearchBoard.generate_all_moves", lambda: list(search_board.generate_all_moves(True))),
+        ("Board.move", lambda: board.move(move)),
+        ("BitBoard.move", lambda: bitboard.move(move)),
+        ("SearchBoard.make/unmake", make_unmake),
+        ("Greedy cost", lambda: greedy._get_current_cost(board, distances)),
+        ("Minimax heuristic", lambda: minimax._get_heuristic_value(search_board)),
+        ("Greedy", lambda: greedy.play(board)),
+        ("Minimax(2)", lambda: Minimax(white=True, depth=2).play(board)),
+        # new engines each time, so the transposition table starts empty
+        ("AlphaBeta(3)", lambda: AlphaBeta(white=True, depth=3, table_mb=1).play(board)),
+        ("AlphaBeta(4) killer/history", lambda: AlphaBeta(white=True, depth=4, table_mb=1,
+                                                          ordering=KillerHistoryOrdering()).play(board)),
+        ("PVS(3)", lambda: PVS(white=True, depth=3, table_mb=1).play(board)),
+        ("PVS(4) killer/history", lambda: PVS(white=True, depth=4, table_mb=1,
+                                              ordering=KillerHistoryOrdering()).play(board)),
+        ("MCTS(200)", lambda: MCTS(white=True, iterations=200).play(board)),
+    ]
+
+
+def compare_searches(board, depths=(2, 3, 4)):
+    """Return the (engine, nodes, seconds) of AlphaBeta and PVS searches to each of the given depths on the board"""
+    results = []
+    for depth in depths:
+        for engine in (AlphaBeta(white=True, depth=depth, table_mb=1), PVS(white=True, depth=depth, table_mb=1)):
+            seconds = time_call(lambda: copy.deepcopy(engine).play(board), repeat=3)
+            engine.play(board)
+            results.append((engine, engine.nodes, seconds))
+    return results
+
+
+def run_benchmarks(names=None, repeat=5, perft_depth=3):
+    """Time each benchmark on each of the named positions (all of them by default) and print the results"""
+    for name, board in positions().items():
+        if names and name not in names:
+            continue
+        print(name)
+        print(board)
+        for benchmark, func in benchmarks(board):
+            random.seed(0) # MCTS playouts use the global generator
+            print("  {:32} {:12.1f} us".format(benchmark, time_call(func, repeat) * 1e6))
+        counts = [perft(SearchBoard.from_board(board), depth) for depth in range(1, perft_depth + 1)]
+        expected = PERFT.get(name)
+        check = "" if expected is None else (" ok" if tuple(counts) == expected[:perft_depth] else " MISMATCH")
+        print("  {:32} {}{}".format("perft", counts, check))
+        for engine, nodes, seconds in compare_searches(board):
+            print("  {:32} {:12.1f} us {:8} nodes".format(str(engine), seconds * 1e6, nodes))
+        print()
+
+
+if __name__ == '__main__':
+    # time all the positions, or only those named, e.g. python bench.py midgame endgame
+    run_benchmarks(sys.argv[1:])
@@ -0,0 +1,75 @@
+import hashlib
+import io
+import json
+import os
+import py_compile
+import sys
+import tempfile
+import zipfile
+
+# files the web build needs besides the game's own sources
+WEB_FILES = ['blessed_mock.py']
+BUNDLE = 'game.zip'
+
+
+def bundle_bytes(files, sources, bytecode=False):
+    """
+    Return a zip archive of the given files, read from the source directories (the first
+    to have each file). The archive only depends on the contents of the files, so building
+    it twice gives the same bytes. If bytecode is true, the files are also compiled into
+    __pycache__, which Python only uses if it is the same version as Pyodide's.
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name in files:
+            path = next((os.path.join(source, name) for source in sources
+                         if os.path.exists(os.path.join(source, name))), None)
+            if path is None:
+                raise FileNotFoundError("{} is not in {}".format(name, ', '.join(sources)))
+            _add(archive, name, open(path, 'rb').read())
+            if bytecode:
+                _add(archive, *_bytecode(path, name))
+    return buffer.getvalue()
+
+
+def _add(archive, name, data):
+    info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+    info.compress_type = zipfile.ZIP_DEFLATED
+    archive.writestr(info, data)
+
+
+def _bytecode(path, name):
+    """Return the name in the archive and the contents of the compiled file"""
+    module = os.path.splitext(name)[0]
+    with tempfile.TemporaryDirectory() as directory:
+        # hash-based, so the bytecode doesn't depend on the modification time of the source
+        target = py_compile.compile(path, os.path.join(directory, module + '.pyc'), dfile=name, doraise=True,
+                                    invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+        return '__pycache__/{}.{}.pyc'.format(module, sys.implementation.cache_tag), open(target, 'rb').read()
+
+
+def build(config='game.json', docs='docs', bytecode=False):
+    """
+    Pack the files listed in the config (and the web build's own files) into docs/game.zip,
+    and write the config to docs/game.json with the name of the bundle and a version,
+    the hash of its contents, which the page fetches it by, so a new build is never served
+    from a stale cache. Return the version.
+    """
+    with open(config) as f:
+        game = json.load(f)
+    root = os.path.dirname(os.path.abspath(config))
+    data = bundle_bytes(game['files'] + WEB_FILES, [root, docs], bytecode)
+    with open(os.path.join(docs, BUNDLE), 'wb') as f:
+        f.write(data)
+    game['bundle'] = BUNDLE
+    game['version'] = hashlib.sha256(data).hexdigest()[:16]
+    with open(os.path.join(docs, 'game.json'), 'w') as f:
+        json.dump(game, f, indent=2)
+        f.write('\n')
+    return game['version']
+
+
+if __name__ == '__main__':
+    # build the web bundle, with bytecode if --bytecode is given (for the Python version Pyodide uses)
+    version = build(bytecode='--bytecode' in sys.argv[1:])
+    print("Built docs/{} version {}".format(BUNDLE, version))
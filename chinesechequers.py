@@ -1,9 +1,14 @@
 import math
+import random
+
+from geometry import Geometry
 
 
 class Hex:
     """A location on the board."""
 
+    __slots__ = ('q', 'r', 'hash', 'pairs')
+
     dict = {} # cache instances for efficiency
 
     @classmethod
@@ -22,7 +27,13 @@ class Hex:
         cls.dict[(q, r)] = h
         return h
 
+    def __getnewargs__(self):
+        # so that unpickling goes through __new__ and returns the cached instance
+        return self.q, self.r
+
     def __eq__(self, other):
+        if self is other: # instances are cached, so this is the usual case
+            return True
         if isinstance(other, self.__class__):
             return self.q == other.q and self.r == other.r
         return False
@@ -56,12 +67,32 @@ class Hex:
 
 
 class Move:
-    """A move from one location to another."""
+    """A move from one location to another, packable into a small int (see pack and unpack)."""
+
+    __slots__ = ('start', 'end', 'hash')
 
-    def __init__(self, start, end, jump_path=None):
+    def __init__(self, start, end):
         self.start = start
         self.end = end
-        self.jump_path = jump_path
+        self.hash = None
+
+    @classmethod
+    def unpack(cls, packed, size):
+        """Return the move for a packed int on a board of the given size"""
+        cells = get_board_cells(size)
+        start, end = divmod(packed, size * size)
+        return cls(cells[start], cells[end])
+
+    def pack(self, size):
+        """Return this move as an int, for a board of the given size"""
+        return (self.start.q * size + self.start.r) * size * size + self.end.q * size + self.end.r
+
+    def transform(self, transform, size):
+        """Return this move under one of the Geometry symmetries of a board of the given size"""
+        geometry = Geometry.of(size)
+        cells = get_board_cells(size)
+        table = geometry.transforms[transform]
+        return Move(cells[table[self.start.q * size + self.start.r]], cells[table[self.end.q * size + self.end.r]])
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
@@ -69,7 +100,9 @@ class Move:
         return False
 
     def __hash__(self):
-        return hash((self.start, self.end))
+        if self.hash is None:
+            self.hash = hash((self.start.q, self.start.r, self.end.q, self.end.r))
+        return self.hash
 
     def __repr__(self):
         return "{}->{}".format(self.start, self.end)
@@ -85,6 +118,47 @@ class Move:
         return "{}{} {}{}".format(self.start.q, self.start.r, self.end.q, self.end.r)
 
 
+def _jump_path(parents, end):
+    """Return the jump path to end by following parent pointers back to the start"""
+    path = []
+    while end is not None:
+        path.append(end)
+        end = parents[end]
+    return tuple(reversed(path))
+
+
+board_cells = {} # cache the Hex for each cell index, per board size
+
+
+def get_board_cells(size):
+    """Return the Hex for each cell index of a board of the given size"""
+    cells = board_cells.get(size)
+    if cells is None:
+        cells = tuple(Hex(q, r) for q, r in Geometry.of(size).coords)
+        board_cells[size] = cells
+    return cells
+
+
+zobrist_keys = {} # cache the Zobrist keys, per board size
+
+
+def get_zobrist_keys(size):
+    """
+    Return random 64-bit keys for a white piece and for a black piece on each cell index
+    of a board of the given size, and a key for black to move. A position's Zobrist hash
+    is the XOR of the keys of its pieces.
+    """
+    keys = zobrist_keys.get(size)
+    if keys is None:
+        rng = random.Random(size) # fixed seed so hashes are the same from run to run
+        num_cells = size * size
+        white_keys = tuple(rng.getrandbits(64) for _ in range(num_cells))
+        black_keys = tuple(rng.getrandbits(64) for _ in range(num_cells))
+        keys = white_keys, black_keys, rng.getrandbits(64)
+        zobrist_keys[size] = keys
+    return keys
+
+
 class Board:
     """A board containing the pieces of both players."""
 
@@ -111,6 +185,8 @@ class Board:
         self.size = size
         self.white_win = white_win
         self.black_win = black_win
+        self.geometry = Geometry.of(size)
+        self.cells = get_board_cells(size)
         assert len(self.white_pieces & self.black_pieces) == 0
         assert len(self.white_pieces) == len(self.white_win)
         assert len(self.black_pieces) == len(self.black_win)
@@ -130,45 +206,60 @@ class Board:
         return hex in self.white_pieces or hex in self.black_pieces
 
     def generate_moves(self, piece):
-        # go through all the immediate neighbors
-        for neighbor, _ in piece.neighbor_pairs():
-            # return neighbor only if it is on the board and empty (since the piece could move there)
-            if self.on_board(neighbor) and not self.piece_at(neighbor):
-                yield Move(piece, neighbor)
+        cells = self.cells
+        # go through all the immediate neighbors on the board
+        for neighbor in self.geometry.neighbors[piece.q * self.size + piece.r]:
+            # return neighbor only if it is empty (since the piece could move there)
+            if not self.piece_at(cells[neighbor]):
+                yield Move(piece, cells[neighbor])
         # then go through all the jump paths
         for move in self._generate_all_jump_moves(piece):
             yield move
 
     def _generate_all_jump_moves(self, piece):
         """Return all the positions that are multiple jumps for the given piece"""
-        jump_paths = []
-        new = [(piece, jump) for jump in self._generate_single_jumps(piece)]
-        jump_paths.extend(new)
-        while True:
-            new = self._extend_jump_paths(new)
-            if len(new) == 0:
-                break
-            jump_paths.extend(new)
-        # and return unique jump moves (along with a jump path for rendering)
-        jumps_dict = {jump_path[-1]:jump_path for jump_path in jump_paths}
-        for jump, jump_path in jumps_dict.items():
-            yield Move(piece, jump, jump_path)
+        # flood fill outwards from the piece, visiting each landing position once and
+        # recording the position it was reached from
+        parents = {piece: None}
+        new = [piece]
+        while new:
+            new = self._extend_jumps(new, parents)
+        # and return jump moves
+        for jump in parents:
+            if jump is not piece:
+                yield Move(piece, jump)
+
+    def jump_path(self, move):
+        """
+        Return the positions a jump move passes through, from its start to its end, or None
+        if the move is a single step. The move must be valid on this board.
+        """
+        if move.end.q * self.size + move.end.r in self.geometry.neighbors[move.start.q * self.size + move.start.r]:
+            return None
+        parents = {move.start: None}
+        new = [move.start]
+        while move.end not in parents:
+            if not new:
+                raise ValueError("No jump path for " + repr(move))
+            new = self._extend_jumps(new, parents)
+        return _jump_path(parents, move.end)
 
     def _generate_single_jumps(self, piece):
         """Return all the positions that are single jumps for the given piece"""
-        for neighbor1, neighbor2 in piece.neighbor_pairs():
-            # return neighbor2 only if neighbor1 has a piece, and neighbor2 is on the board and is a piece
-            if self.piece_at(neighbor1) and self.on_board(neighbor2) and not self.piece_at(neighbor2):
-                yield neighbor2
-
-    def _extend_jump_paths(self, jump_paths):
-        # extend paths where possible and return only the ones that have been extended
+        cells = self.cells
+        for neighbor1, neighbor2 in self.geometry.jumps[piece.q * self.size + piece.r]:
+            # return neighbor2 only if neighbor1 has a piece, and neighbor2 is empty
+            if self.piece_at(cells[neighbor1]) and not self.piece_at(cells[neighbor2]):
+                yield cells[neighbor2]
+
+    def _extend_jumps(self, positions, parents):
+        # return the positions that are single jumps from the given ones and have not been visited yet
         new = []
-        for jump_path in jump_paths:
-            last = jump_path[-1]
-            for next in self._generate_single_jumps(last):
-                if next not in jump_path: # avoid circles
-                    new.append(jump_path + (next,)) # extend the path
+        for position in positions:
+            for next in self._generate_single_jumps(position):
+                if next not in parents:
+                    parents[next] = position
+                    new.append(next)
         return new
 
     def generate_all_moves(self, white):
@@ -212,3 +303,297 @@ class Board:
                 str = str + pos + " "
             str = str + "\n"
         return str
+
+
+def _indices(bits):
+    """Return the cell indices of the set bits in the given bitmask, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class BitBoard:
+    """A board containing the pieces of both players, as two bitmasks (cell (q, r) is bit q * size + r)."""
+
+    EMPTY = Board.EMPTY
+    BLACK = Board.BLACK
+    WHITE = Board.WHITE
+
+    @classmethod
+    def start(cls, size=7):
+        """Create a starting board of the given size (length of one side)"""
+        return cls.from_board(Board.start(size))
+
+    @classmethod
+    def from_board(cls, board):
+        """Create a bitboard with the same position as the given Board (or BitBoard)"""
+        if isinstance(board, BitBoard):
+            return cls(board.white, board.black, board.size, board.white_win, board.black_win)
+        def mask(pieces):
+            return sum(1 << (hex.q * board.size + hex.r) for hex in pieces)
+        return cls(mask(board.white_pieces), mask(board.black_pieces), board.size,
+                   mask(board.white_win), mask(board.black_win))
+
+    def __init__(self, white, black, size, white_win, black_win):
+        """Create a board with the given white and black bitmasks of the given size"""
+        self.white = white
+        self.black = black
+        self.size = size
+        self.white_win = white_win
+        self.black_win = black_win
+        self.geometry = Geometry.of(size)
+        self.cells = get_board_cells(size)
+
+    @property
+    def white_pieces(self):
+        return frozenset(self.pieces(True))
+
+    @property
+    def black_pieces(self):
+        return frozenset(self.pieces(False))
+
+    def pieces(self, white):
+        """Return the locations of the pieces of the given player"""
+        cells = self.cells
+        for i in _indices(self.white if white else self.black):
+            yield cells[i]
+
+    def white_has_won(self):
+        return self.white == self.white_win
+
+    def black_has_won(self):
+        return self.black == self.black_win
+
+    def on_board(self, hex):
+        """Return true if the given location is on the board"""
+        return 0 <= hex.q < self.size and 0 <= hex.r < self.size
+
+    def piece_at(self, hex):
+        """Return true if there is a piece at the given location on the board"""
+        return self.on_board(hex) and bool((self.white | self.black) >> (hex.q * self.size + hex.r) & 1)
+
+    def generate_moves(self, piece):
+        start = piece.q * self.size + piece.r
+        occupied = self.white | self.black
+        cells = self.cells
+        # go through all the immediate neighbors that are empty
+        for neighbor in self.geometry.neighbors[start]:
+            if not occupied >> neighbor & 1:
+                yield Move(piece, cells[neighbor])
+        # then go through all the jump paths
+        for move in self._generate_all_jump_moves(start, occupied):
+            yield move
+
+    def _generate_all_jump_moves(self, start, occupied):
+        """Return all the positions that are multiple jumps for the piece at the given index"""
+        # flood fill outwards from the piece, visiting each landing index once and
+        # recording the index it was reached from
+        parents = {start: None}
+        new = [start]
+        while new:
+            extended = []
+            for index in new:
+                for next in self._generate_single_jumps(index, occupied):
+                    if next not in parents:
+                        parents[next] = index
+                        extended.append(next)
+            new = extended
+        # and return jump moves
+        cells = self.cells
+        for jump in parents:
+            if jump != start:
+                yield Move(cells[start], cells[jump])
+
+    def jump_path(self, move):
+        """
+        Return the positions a jump move passes through, from its start to its end, or None
+        if the move is a single step. The move must be valid on this board.
+        """
+        start = move.start.q * self.size + move.start.r
+        end = move.end.q * self.size + move.end.r
+        if end in self.geometry.neighbors[start]:
+            return None
+        occupied = self.white | self.black
+        parents = {start: None}
+        new = [start]
+        while end not in parents:
+            if not new:
+                raise ValueError("No jump path for " + repr(move))
+            extended = []
+            for index in new:
+                for next in self._generate_single_jumps(index, occupied):
+                    if next not in parents:
+                        parents[next] = index
+                        extended.append(next)
+            new = extended
+        cells = self.cells
+        return tuple(cells[i] for i in _jump_path(parents, end))
+
+    def _generate_single_jumps(self, index, occupied):
+        """Return all the cell indices that are single jumps from the given index"""
+        for over, landing in self.geometry.jumps[index]:
+            if occupied >> over & 1 and not occupied >> landing & 1:
+                yield landing
+
+    def generate_all_moves(self, white):
+        """Return all the valid moves from this board"""
+        cells = self.cells
+        for start in _indices(self.white if white else self.black):
+            for move in self.generate_moves(cells[start]):
+                yield move
+
+    def move(self, move):
+        """Apply the given move to the current board and return the resulting board"""
+        start = move.start.q * self.size + move.start.r
+        end = move.end.q * self.size + move.end.r
+        assert not (self.white | self.black) >> end & 1
+        bits = 1 << start | 1 << end
+        if self.white >> start & 1:
+            return BitBoard(self.white ^ bits, self.black, self.size, self.white_win, self.black_win)
+        elif self.black >> start & 1:
+            return BitBoard(self.white, self.black ^ bits, self.size, self.white_win, self.black_win)
+        else:
+            raise Exception("No such piece " + str(move.start))
+
+    def generate_boards(self, white):
+        """Return all the boards one move away from this board"""
+        for move in self.generate_all_moves(white):
+            yield self.move(move)
+
+    def transform(self, transform):
+        """
+        Return this position under one of the Geometry symmetries. The rotations also swap
+        the colours, so the player to move swaps too, and they assume the usual targets
+        (each side's target is where the other side starts, as in start).
+        """
+        table = self.geometry.transforms[transform]
+        white = 0
+        for i in _indices(self.white):
+            white |= 1 << table[i]
+        black = 0
+        for i in _indices(self.black):
+            black |= 1 << table[i]
+        if transform & Geometry.ROTATE:
+            return BitBoard(black, white, self.size, self.white_win, self.black_win)
+        return BitBoard(white, black, self.size, self.white_win, self.black_win)
+
+    def canonical(self, white_to_move=True):
+        """
+        Return the canonical form of this position with the given player to move, and the
+        symmetry that maps this position to it. The canonical position always has white to
+        move, and all the (up to four) symmetric positions have the same one, so its
+        (white, black) bitmasks or zobrist_hash can key a cache shared between them. A move
+        found for the canonical position maps back to this one by Move.transform with the
+        same symmetry.
+        """
+        transform = Geometry.IDENTITY if white_to_move else Geometry.ROTATE
+        board = self.transform(transform)
+        mirrored = board.transform(Geometry.MIRROR)
+        if (mirrored.white, mirrored.black) < (board.white, board.black):
+            return mirrored, transform | Geometry.MIRROR
+        return board, transform
+
+    def zobrist_hash(self, white_to_move=True):
+        """Return the Zobrist hash of this position with the given player to move"""
+        white_keys, black_keys, black_to_move_key = get_zobrist_keys(self.size)
+        hash = 0 if white_to_move else black_to_move_key
+        for i in _indices(self.white):
+            hash ^= white_keys[i]
+        for i in _indices(self.black):
+            hash ^= black_keys[i]
+        return hash
+
+    def to_board(self):
+        """Return a Board with the same position as this bitboard"""
+        cells = self.cells
+        return Board(self.white_pieces, self.black_pieces, self.size,
+                     frozenset(cells[i] for i in _indices(self.white_win)),
+                     frozenset(cells[i] for i in _indices(self.black_win)))
+
+    def __eq__(self, other):
+        if isinstance(other, BitBoard):
+            return self.white == other.white and self.black == other.black and self.size == other.size
+        return False
+
+    def __hash__(self):
+        return hash((self.white, self.black))
+
+    def __str__(self):
+        """Return a printable representation of this board"""
+        str = ""
+        for r in range(self.size):
+            str = str + " " * r
+            for q in range(self.size):
+                if self.white >> (q * self.size + r) & 1:
+                    pos = self.WHITE
+                elif self.black >> (q * self.size + r) & 1:
+                    pos = self.BLACK
+                else:
+                    pos = self.EMPTY
+                str = str + pos + " "
+            str = str + "\n"
+        return str
+
+
+class SearchBoard(BitBoard):
+    """A mutable bitboard for search engines, with make and unmake, and a running Zobrist hash and evaluation."""
+
+    def __init__(self, white, black, size, white_win, black_win, white_values=None, black_values=None):
+        super().__init__(white, black, size, white_win, black_win)
+        self.white_keys, self.black_keys, self.black_to_move_key = get_zobrist_keys(size)
+        self.hash = BitBoard.zobrist_hash(self)
+        self.white_values = white_values
+        self.black_values = black_values
+        self.value = 0
+        if white_values is not None:
+            self.value += sum(white_values[i] for i in _indices(white))
+        if black_values is not None:
+            self.value += sum(black_values[i] for i in _indices(black))
+
+    @classmethod
+    def from_board(cls, board, white_values=None, black_values=None):
+        """Create a search board with the same position as the given board, evaluated with the given tables"""
+        bitboard = BitBoard.from_board(board)
+        return cls(bitboard.white, bitboard.black, bitboard.size, bitboard.white_win, bitboard.black_win,
+                   white_values, black_values)
+
+    def make(self, move):
+        """Apply the given move to this board in place"""
+        start = move.start.q * self.size + move.start.r
+        end = move.end.q * self.size + move.end.r
+        bits = 1 << start | 1 << end
+        if self.white >> start & 1:
+            self.white ^= bits
+            self.hash ^= self.white_keys[start] ^ self.white_keys[end]
+            if self.white_values is not None:
+                self.value += self.white_values[end] - self.white_values[start]
+        else:
+            self.black ^= bits
+            self.hash ^= self.black_keys[start] ^ self.black_keys[end]
+            if self.black_values is not None:
+                self.value += self.black_values[end] - self.black_values[start]
+
+    def unmake(self, move):
+        """Take back the given move, which must be the last one made on this board"""
+        start = move.start.q * self.size + move.start.r
+        end = move.end.q * self.size + move.end.r
+        bits = 1 << start | 1 << end
+        if self.white >> end & 1:
+            self.white ^= bits
+            self.hash ^= self.white_keys[start] ^ self.white_keys[end]
+            if self.white_values is not None:
+                self.value -= self.white_values[end] - self.white_values[start]
+        else:
+            self.black ^= bits
+            self.hash ^= self.black_keys[start] ^ self.black_keys[end]
+            if self.black_values is not None:
+                self.value -= self.black_values[end] - self.black_values[start]
+
+    def zobrist_hash(self, white_to_move=True):
+        """Return the Zobrist hash of this position with the given player to move"""
+        return self.hash if white_to_move else self.hash ^ self.black_to_move_key
+
+    def snapshot(self):
+        """Return an immutable copy of the current position"""
+        return BitBoard.from_board(self)
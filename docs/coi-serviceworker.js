@@ -1,5 +1,12 @@
 /*! coi-serviceworker v0.1.7 - Guido Zuidhof and contributors, licensed under MIT */
 let coepCredentialless = false;
+// Responses that never change once built are kept in this cache: the game bundle (fetched
+// with its version, e.g. game.zip?v=...) and Pyodide itself (at a versioned CDN path)
+const CACHE_NAME = "game-assets";
+function isImmutable(url) {
+    return (url.origin === self.location.origin && url.searchParams.has("v"))
+        || (url.hostname === "cdn.jsdelivr.net" && url.pathname.startsWith("/pyodide/v"));
+}
 if (typeof window === 'undefined') {
     self.addEventListener("install", () => self.skipWaiting());
     self.addEventListener("activate", (event) => event.waitUntil(self.clients.claim()));
@@ -32,8 +39,11 @@ if (typeof window === 'undefined') {
                 credentials: "omit",
             })
             : r;
+        const url = new URL(r.url);
+        const cacheable = r.method === "GET" && isImmutable(url);
         event.respondWith(
-            fetch(request)
+            (cacheable ? caches.open(CACHE_NAME).then((cache) => cache.match(r)) : Promise.resolve(undefined))
+                .then((cached) => cached || fetch(request)
                 .then((response) => {
                     if (response.status === 0) {
                         return response;
@@ -48,12 +58,26 @@ if (typeof window === 'undefined') {
                     }
                     newHeaders.set("Cross-Origin-Opener-Policy", "same-origin");
 
-                    return new Response(response.body, {
+                    const newResponse = new Response(response.body, {
                         status: response.status,
                         statusText: response.statusText,
                         headers: newHeaders,
                     });
-                })
+                    if (cacheable && response.ok) {
+                        const copy = newResponse.clone();
+                        event.waitUntil(caches.open(CACHE_NAME).then(async (cache) => {
+                            // drop the bundles of earlier builds
+                            for (const key of await cache.keys()) {
+                                const keyUrl = new URL(key.url);
+                                if (keyUrl.origin === url.origin && keyUrl.pathname === url.pathname) {
+                                    await cache.delete(key);
+                                }
+                            }
+                            await cache.put(r, copy);
+                        }));
+                    }
+                    return newResponse;
+                }))
                 .catch((e) => console.error(e))
         );
     });
@@ -31,14 +31,34 @@ def _web_sleep(seconds):
 time.sleep = _web_sleep
 `;
 
+// Fetch a file, failing with a clear message (rather than returning the 404 page) if it is missing
+async function fetchOk(url, options) {
+    const response = await fetch(url, options);
+    if (!response.ok) {
+        throw new Error(`Could not load ${url} (${response.status} ${response.statusText})`);
+    }
+    return response;
+}
+
+function showError(message) {
+    self.postMessage({ type: 'output', data: '\r\n\x1b[31m' + message + '\x1b[m\r\n' });
+}
+
 self.onmessage = async (e) => {
     if (e.data.type !== 'init') return;
 
     inputArr = new Int32Array(e.data.inputBuf);
     const pyodide = await loadPyodide();
 
-    // Load game config and fetch Python source files into Pyodide VFS
-    const config = await fetch('game.json').then(r => r.json());
+    // Load game config (always revalidated, since it names the current bundle) and fetch
+    // the Python sources into Pyodide VFS
+    let config;
+    try {
+        config = await fetchOk('game.json', { cache: 'no-cache' }).then(r => r.json());
+    } catch (err) {
+        showError(String(err.message));
+        return;
+    }
     const entry = config.entry ?? 'play.py';
 
     if (config.packages?.length) {
@@ -54,9 +74,21 @@ self.onmessage = async (e) => {
         }
     }
 
-    for (const name of [...config.files, 'blessed_mock.py']) {
-        const text = await fetch(name).then(r => r.text());
-        pyodide.FS.writeFile(name, text);
+    try {
+        if (config.bundle) {
+            // one archive of all the sources, built by build.py; the version in the URL lets
+            // coi-serviceworker.js cache it until the next build
+            const bundle = await fetchOk(`${config.bundle}?v=${config.version}`).then(r => r.arrayBuffer());
+            pyodide.unpackArchive(bundle, 'zip');
+        } else {
+            // without a bundle the sources must be next to this script
+            const names = [...config.files, 'blessed_mock.py'];
+            const texts = await Promise.all(names.map(name => fetchOk(name).then(r => r.text())));
+            names.forEach((name, i) => pyodide.FS.writeFile(name, texts[i]));
+        }
+    } catch (err) {
+        showError(String(err.message) + ' (run python build.py to build docs/game.zip)');
+        return;
     }
 
     // Expose shared buffer and postMessage to Python
@@ -69,13 +101,28 @@ self.onmessage = async (e) => {
     self.postMessage({ type: 'ready' });
 
     try {
-        await pyodide.runPythonAsync(`
+        if (config.main) {
+            // an async entry point searches in slices, yielding to the event loop between them
+            // and reporting its progress, so the worker stays responsive while the AI thinks
+            await pyodide.runPythonAsync(`
+import runpy
+_game = runpy.run_path('${entry}', run_name='__web__')
+
+def _report(depth, value, move, nodes):
+    _bm._post_message({'type': 'progress', 'data': 'Thinking: depth {}, best {} ({:+.2f}), {} nodes'.format(
+        depth, move, value, nodes)})
+
+await _game['${config.main}'](_report)
+`);
+        } else {
+            await pyodide.runPythonAsync(`
 import runpy
 runpy.run_path('${entry}', run_name='__main__')
 `);
+        }
     } catch (err) {
         // Surface Python exceptions to the terminal
-        self.postMessage({ type: 'output', data: '\r\n\x1b[31m' + String(err) + '\x1b[m\r\n' });
+        showError(String(err));
     }
 
     self.postMessage({ type: 'output', data: '\r\n[Game over — refresh to restart]\r\n' });
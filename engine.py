@@ -0,0 +1,151 @@
+import asyncio
+import copy
+import threading
+import time
+
+from play import *
+
+
+class Limits:
+    """Limits on a search: the depth, the time in seconds and the number of nodes (None for the player's own)"""
+
+    def __init__(self, depth=None, time=None, nodes=None):
+        self.depth = depth
+        self.time = time
+        self.nodes = nodes
+
+
+class Info:
+    """
+    A progress report from a search: the depth completed, the value of the position for
+    the player to move, the best move so far, the number of nodes searched, the time taken
+    and the principal variation. Values and nodes are None where the player does not have
+    them. The last report of each search is final, and has the move the player would play.
+    """
+
+    def __init__(self, depth, score, move, nodes, time, pv=(), final=False):
+        self.depth = depth
+        self.score = score
+        self.move = move
+        self.nodes = nodes
+        self.time = time
+        self.pv = pv
+        self.final = final
+
+    def __repr__(self):
+        return "Info(depth={}, score={}, move={}, nodes={}, time={:.3f}{})".format(
+            self.depth, self.score, self.move, self.nodes, self.time, ", final" if self.final else "")
+
+
+class AsyncEngine:
+    """
+    Runs a player's searches in an executor (a thread pool by default), for use from asyncio.
+
+    Each search works on a copy of the player, so searches can overlap. AlphaBeta engines
+    (and their subclasses, like PVS) deepen iteratively and report after every iteration,
+    and can be cancelled part way through one. Minimax is searched to depth 1, 2, 3... and
+    reports after each, and can be cancelled between them. Any other player (Greedy, MCTS...)
+    just reports the move it plays. ParallelAlphaBeta can neither report nor be cancelled
+    part way through a search, so it is not supported.
+    """
+
+    def __init__(self, player, executor=None):
+        if isinstance(player, ParallelAlphaBeta):
+            raise ValueError("AsyncEngine does not support ParallelAlphaBeta")
+        self.player = player
+        self.executor = executor
+
+    async def analyse(self, board, limits=None):
+        """
+        Search the board for the player, yielding an Info as each iteration completes. Closing
+        the generator (or cancelling the task iterating it) stops the search.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def report(info):
+            loop.call_soon_threadsafe(queue.put_nowait, info)
+
+        future = loop.run_in_executor(self.executor, self._search, board, limits or Limits(), report, stop)
+        try:
+            while True:
+                info = await queue.get()
+                if info is None: # the search has finished
+                    break
+                yield info
+        finally:
+            stop.set()
+            await future
+
+    async def play(self, board, limits=None):
+        """Search the board and return the move the player would play"""
+        move = None
+        async for info in self.analyse(board, limits):
+            move = info.move
+        return move
+
+    def _search(self, board, limits, report, stop):
+        player = None
+        try:
+            player = copy.deepcopy(self.player)
+            if isinstance(player, AlphaBeta):
+                self._search_alphabeta(player, board, limits, report, stop)
+            elif isinstance(player, Minimax):
+                self._search_minimax(player, board, limits, report, stop)
+            else:
+                if limits.time is not None and hasattr(player, 'set_time_control'):
+                    player.set_time_control(limits.time)
+                start = time.time()
+                move = player.play(board)
+                report(Info(None, None, move, None, time.time() - start, final=True))
+        finally:
+            # the copy's resources (such as worker processes) are not shared with the player
+            if hasattr(player, 'close'):
+                player.close()
+            report(None)
+
+    def _search_alphabeta(self, player, board, limits, report, stop):
+        start = time.time()
+
+        def on_iteration(depth, value, move):
+            report(Info(depth, value, move, player.nodes, time.time() - start, tuple(getattr(player, 'pv', ()))))
+
+        if limits.depth is not None:
+            player.depth = limits.depth
+        if limits.time is not None:
+            player.time_limit = limits.time
+        if limits.nodes is not None:
+            player.node_limit = limits.nodes
+        player.stop = stop
+        player.on_iteration = on_iteration
+        move = player.play(board)
+        report(Info(player.completed_depth, player.value, move, player.nodes, time.time() - start,
+                    tuple(getattr(player, 'pv', ())), final=True))
+
+    def _search_minimax(self, player, board, limits, report, stop):
+        start = time.time()
+        player.instrument = True # to count the nodes
+        nodes = 0
+        info = Info(0, None, None, 0, 0.0)
+        for depth in range(1, (limits.depth or player.depth) + 1):
+            if info.move is not None and (stop.is_set() or limits.time is not None and time.time() - start >= limits.time
+                                          or limits.nodes is not None and nodes >= limits.nodes):
+                break
+            player.depth = depth
+            move = player.play(board)
+            nodes += player.stats.nodes
+            info = Info(depth, player.value, move, nodes, time.time() - start)
+            report(info)
+        report(Info(info.depth, info.score, info.move, info.nodes, time.time() - start, final=True))
+
+
+if __name__ == '__main__':
+    # stream a PVS search of the start position, e.g. python engine.py 2
+    import sys
+
+    async def main(seconds):
+        async for info in AsyncEngine(PVS(white=True)).analyse(Board.start(7), Limits(time=seconds)):
+            print(info, ' '.join(str(move) for move in info.pv))
+
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0))
@@ -0,0 +1,137 @@
+import math
+
+
+class Geometry:
+    """
+    Precomputed adjacency and jump tables for a board of a given size.
+
+    Cells are numbered q * size + r. For each cell, neighbors holds the indices of the
+    neighbors that are on the board, and jumps the (over, landing) index pairs where
+    the landing cell is on the board, both in the same order as Hex.neighbor_pairs.
+    Move generation can then walk these tables without any bounds checks.
+    """
+
+    # the six (q, r) offsets of the neighbors of a cell, in Hex.neighbor_pairs order
+    DIRECTIONS = ((-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0))
+
+    # the metrics that distance tables can be built for
+    METRICS = ('euclidean', 'hex', 'hops')
+
+    # the symmetries of the two-player board, as indices into transforms (each is its own inverse)
+    IDENTITY = 0
+    MIRROR = 1 # swap q and r
+    ROTATE = 2 # rotate by 180 degrees, which also swaps the colours
+    ROTATE_MIRROR = 3
+
+    cache = {} # one instance per size
+
+    @classmethod
+    def of(cls, size):
+        """Return the geometry for a board of the given size"""
+        geometry = cls.cache.get(size)
+        if geometry is None:
+            geometry = cls(size)
+            cls.cache[size] = geometry
+        return geometry
+
+    def __init__(self, size):
+        self.size = size
+        self.num_cells = size * size
+        self.coords = tuple((q, r) for q in range(size) for r in range(size))
+        neighbors = []
+        jumps = []
+        for q, r in self.coords:
+            ns = []
+            js = []
+            for dq, dr in self.DIRECTIONS:
+                if self.on_board(q + dq, r + dr):
+                    ns.append(self.index(q + dq, r + dr))
+                    if self.on_board(q + 2 * dq, r + 2 * dr):
+                        js.append((self.index(q + dq, r + dr), self.index(q + 2 * dq, r + 2 * dr)))
+            neighbors.append(tuple(ns))
+            jumps.append(tuple(js))
+        self.neighbors = tuple(neighbors)
+        self.jumps = tuple(jumps)
+        self.distance_tables = {} # cache per (metric, target)
+        # the cell index each cell maps to under each symmetry
+        identity = tuple(range(self.num_cells))
+        mirror = tuple(self.index(r, q) for q, r in self.coords)
+        rotate = tuple(self.num_cells - 1 - i for i in identity)
+        self.transforms = (identity, mirror, rotate, tuple(rotate[i] for i in mirror))
+
+    def index(self, q, r):
+        """Return the index of the cell at (q, r)"""
+        return q * self.size + r
+
+    def on_board(self, q, r):
+        """Return true if (q, r) is on the board"""
+        return 0 <= q < self.size and 0 <= r < self.size
+
+    def distances(self, metric, target):
+        """
+        Return the distance from each cell to the target cell index, using one of the metrics:
+
+        euclidean -- the 'euclidean' distance of Hex.distance
+        hex -- the number of single steps between the cells
+        hops -- the fewest single steps or single jumps between the cells, as if there were
+            always a piece to jump over
+        """
+        table = self.distance_tables.get((metric, target))
+        if table is None:
+            if metric == 'euclidean':
+                table = self._euclidean_distances(target)
+            elif metric == 'hex':
+                table = self._hex_distances(target)
+            elif metric == 'hops':
+                table = self._hop_distances(target)
+            else:
+                raise ValueError("Unknown metric " + metric)
+            self.distance_tables[(metric, target)] = table
+        return table
+
+    def _euclidean_distances(self, target):
+        tq, tr = self.coords[target]
+        return tuple(math.sqrt((tq - q) * (tq - q) + (tr - r) * (tr - r)) for q, r in self.coords)
+
+    def _hex_distances(self, target):
+        tq, tr = self.coords[target]
+        return tuple((abs(tq - q) + abs(tr - r) + abs(tq - q + tr - r)) // 2 for q, r in self.coords)
+
+    def _hop_distances(self, target):
+        # breadth-first search out from the target (steps and jumps are both reversible)
+        distances = [None] * self.num_cells
+        distances[target] = 0
+        new = [target]
+        while new:
+            next = []
+            for index in new:
+                for neighbor in self.neighbors[index]:
+                    if distances[neighbor] is None:
+                        distances[neighbor] = distances[index] + 1
+                        next.append(neighbor)
+                for _, landing in self.jumps[index]:
+                    if distances[landing] is None:
+                        distances[landing] = distances[index] + 1
+                        next.append(landing)
+            new = next
+        return tuple(distances)
+
+    def destinations(self, start, occupied):
+        """
+        Return the indices of the cells that a piece at the start index can move to (single
+        steps, then jumps in breadth-first order), given a bitmask of the occupied cells.
+        This is a fast path for playouts that builds no Hex or Move objects.
+        """
+        ends = [neighbor for neighbor in self.neighbors[start] if not occupied >> neighbor & 1]
+        visited = occupied | 1 << start
+        new = [start]
+        while new:
+            next = []
+            for index in new:
+                for over, landing in self.jumps[index]:
+                    if occupied >> over & 1 and not visited >> landing & 1:
+                        visited |= 1 << landing
+                        next.append(landing)
+            ends.extend(next)
+            new = next
+        return ends
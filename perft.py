@@ -0,0 +1,76 @@
+import sys
+import time
+
+from chinesechequers import *
+
+
+def perft(board, depth, white=True, hashing=False):
+    """
+    Return the number of move sequences of the given depth from the board, with white (or
+    black) to move first. A position where either side has won has no moves, so the game
+    ends there. Works on a Board, BitBoard or SearchBoard (which is searched in place with
+    make and unmake), and all three must give the same totals. If hashing is true, the
+    count below each repeated (position, player to move, depth) is looked up instead of
+    being counted again.
+    """
+    return _perft(board, depth, white, {} if hashing else None)
+
+
+def divide(board, depth, white=True, hashing=False):
+    """Return a dict from each move from the board to the perft of the position after it"""
+    table = {} if hashing else None
+    counts = {}
+    for move in list(board.generate_all_moves(white)):
+        counts[move] = _perft_after(board, move, depth - 1, white, table)
+    return counts
+
+
+def _perft_after(board, move, depth, white, table):
+    if isinstance(board, SearchBoard):
+        board.make(move)
+        count = _perft(board, depth, not white, table)
+        board.unmake(move)
+        return count
+    return _perft(board.move(move), depth, not white, table)
+
+
+def _position_key(board):
+    if isinstance(board, BitBoard):
+        return (board.white, board.black)
+    return (board.white_pieces, board.black_pieces)
+
+
+def _perft(board, depth, white, table):
+    if depth == 0:
+        return 1
+    if board.white_has_won() or board.black_has_won():
+        return 0
+    if table is not None:
+        key = (_position_key(board), white, depth)
+        count = table.get(key)
+        if count is not None:
+            return count
+    moves = list(board.generate_all_moves(white))
+    if depth == 1:
+        count = len(moves)
+    else:
+        count = 0
+        for move in moves:
+            count += _perft_after(board, move, depth - 1, white, table)
+    if table is not None:
+        table[key] = count
+    return count
+
+
+if __name__ == '__main__':
+    # print the divide breakdown from the start position, e.g. python perft.py 3
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    board = SearchBoard.from_board(Board.start(7))
+    start_time = time.time()
+    counts = divide(board, depth, hashing=True)
+    elapsed = time.time() - start_time
+    for move, count in counts.items():
+        print("{}: {}".format(move, count))
+    print("Moves: {}".format(len(counts)))
+    print("Total: {}".format(sum(counts.values())))
+    print("Time: {:.3f}s".format(elapsed))
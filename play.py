@@ -1,6 +1,14 @@
 from chinesechequers import *
+from geometry import Geometry
+import asyncio
+import concurrent.futures
+import contextlib
+import copy
 import itertools
+import math
+import multiprocessing
 import random
+import threading
 import time
 
 from blessed import Terminal
@@ -26,9 +34,11 @@ class Random:
         return "Random"
 
 class Greedy:
-    def __init__(self, white, randomize=False):
+    def __init__(self, white, randomize=False, metric='euclidean'):
+        """Play the move that minimizes the sum of distances to the target corner, using the given metric"""
         self.white = white
         self.randomize = randomize
+        self.metric = metric
 
     def set_white(self, white):
         self.white = white
@@ -38,53 +48,254 @@ class Greedy:
         moves = list(board.generate_all_moves(self.white))
         if self.randomize:
             random.shuffle(moves)
-        move = min(moves, key=lambda move: self._get_cost(board, move))
+        distances = self._get_distances(board.size)
+        cost = self._get_current_cost(board, distances)
+        move = min(moves, key=lambda move: cost + self._get_cost_change(distances, board.size, move))
         return move
 
-    def _get_cost(self, board, move):
-        target = Hex(board.size - 1, board.size - 1) if self.white else Hex(0, 0)
-        new_board = board.move(move)
+    def _get_distances(self, size):
+        geometry = Geometry.of(size)
+        target = geometry.index(size - 1, size - 1) if self.white else geometry.index(0, 0)
+        return geometry.distances(self.metric, target)
+
+    def _get_current_cost(self, board, distances):
         cost = 0
-        for piece in new_board.white_pieces if self.white else new_board.black_pieces:
-            cost += piece.distance(target)
+        for piece in board.white_pieces if self.white else board.black_pieces:
+            cost += distances[piece.q * board.size + piece.r]
         return cost
 
+    def _get_cost_change(self, distances, size, move):
+        # only the piece that moves changes the sum of distances, so a move's cost is O(1)
+        return distances[move.end.q * size + move.end.r] - distances[move.start.q * size + move.start.r]
+
+    def _get_cost(self, board, move):
+        """Return the sum of distances to the target corner after the given move"""
+        distances = self._get_distances(board.size)
+        return self._get_current_cost(board, distances) + self._get_cost_change(distances, board.size, move)
+
     def __str__(self):
-        return "Greedy"
+        return "Greedy" if self.metric == 'euclidean' else "Greedy({})".format(self.metric)
+
+class SearchStats:
+    """Statistics of the searches made by an instrumented player: nodes per ply, and cutoffs by move index."""
+
+    def __init__(self):
+        self.searches = 0 # number of moves played
+        self.time = 0.0 # total seconds spent searching
+        self.nodes_per_ply = []
+        self.trees = 0 # searches from the root with more than one ply
+        self.log_branching = 0.0 # the sum over those trees of the log of their branching factor
+        self.leaves = 0 # heuristic evaluations
+        self.cutoffs_per_index = []
+        self.moves = 0 # moves made on the search board
+        self.jump_moves = 0
+
+    def count_tree(self, nodes_per_ply):
+        """Count a search from the root, with the given number of nodes at each ply"""
+        self.nodes_per_ply.extend([0] * (len(nodes_per_ply) - len(self.nodes_per_ply)))
+        for ply, nodes in enumerate(nodes_per_ply):
+            self.nodes_per_ply[ply] += nodes
+        plies = len(nodes_per_ply) - 1
+        if plies > 0:
+            self.trees += 1
+            self.log_branching += math.log(nodes_per_ply[-1] / nodes_per_ply[0]) / plies
+
+    def count_cutoff(self, index):
+        while len(self.cutoffs_per_index) <= index:
+            self.cutoffs_per_index.append(0)
+        self.cutoffs_per_index[index] += 1
+
+    @property
+    def nodes(self):
+        return sum(self.nodes_per_ply)
+
+    @property
+    def cutoffs(self):
+        return sum(self.cutoffs_per_index)
+
+    def nodes_per_second(self):
+        return self.nodes / self.time if self.time else 0.0
+
+    def time_per_move(self):
+        return self.time / self.searches if self.searches else 0.0
+
+    def branching_factor(self):
+        """
+        Return the effective branching factor: the average ratio of nodes at one ply to the
+        ply before in a tree (the geometric mean over the trees)
+        """
+        return math.exp(self.log_branching / self.trees) if self.trees else 0.0
+
+    def first_move_cutoff_rate(self):
+        """Return the fraction of beta cutoffs that came from the first move searched"""
+        return self.cutoffs_per_index[0] / self.cutoffs if self.cutoffs else 0.0
+
+    def mean_cutoff_index(self):
+        """Return the average index in the ordered moves of the move that caused a beta cutoff"""
+        return sum(i * n for i, n in enumerate(self.cutoffs_per_index)) / self.cutoffs if self.cutoffs else 0.0
+
+    def jump_share(self):
+        """Return the fraction of the moves searched that were jumps"""
+        return self.jump_moves / self.moves if self.moves else 0.0
+
+    def add(self, other):
+        """Add the stats of other to these, and return these"""
+        self.nodes_per_ply.extend([0] * (len(other.nodes_per_ply) - len(self.nodes_per_ply)))
+        for ply, nodes in enumerate(other.nodes_per_ply):
+            self.nodes_per_ply[ply] += nodes
+        self.cutoffs_per_index.extend([0] * (len(other.cutoffs_per_index) - len(self.cutoffs_per_index)))
+        for index, cutoffs in enumerate(other.cutoffs_per_index):
+            self.cutoffs_per_index[index] += cutoffs
+        self.trees += other.trees
+        self.log_branching += other.log_branching
+        self.searches += other.searches
+        self.time += other.time
+        self.leaves += other.leaves
+        self.moves += other.moves
+        self.jump_moves += other.jump_moves
+        return self
+
+    def __str__(self):
+        return ("{} moves, {:.3f}s per move, {} nodes ({:.0f}/s), {} leaves, branching factor {:.2f}, "
+                "{} cutoffs ({:.0%} on first move, mean index {:.2f}), {:.0%} jumps, nodes per ply {}").format(
+            self.searches, self.time_per_move(), self.nodes, self.nodes_per_second(), self.leaves,
+            self.branching_factor(), self.cutoffs, self.first_move_cutoff_rate(), self.mean_cutoff_index(),
+            self.jump_share(), self.nodes_per_ply)
+
 
 class Minimax:
-    def __init__(self, white, depth=2, randomize=False):
+    DRAW = 0 # the value of a position repeated on the search path
+    # square values are integers, scaled from the distances, so that the search board's
+    # running value is exact however many moves are made and unmade
+    VALUE_SCALE = 1 << 32
+
+    def __init__(self, white, depth=2, randomize=False, metric='euclidean', instrument=False):
+        """
+        If instrument is true, each move's search statistics are recorded in stats, and
+        added to total_stats (so that they add up over a play_series). Otherwise nothing
+        is recorded, and the search runs exactly as if there were no instrumentation.
+
+        A position that repeats one earlier on the search path (with the same player to
+        move) is scored as a draw, so the search avoids going round in loops.
+        """
         self.white = white
         self.depth = depth
         self.randomize = randomize
+        self.metric = metric
+        self.instrument = instrument
+        self.stats = None
+        self.total_stats = SearchStats()
+        self.path = set() # hashes of the positions on the current search path
+        self.value = None # the value of the last move played
 
     def set_white(self, white):
         self.white = white
 
     def play(self, board):
-        move, value = self._minimax(board, self.depth, True)
+        if self.instrument:
+            with self._instrumented():
+                return self._play(board)
+        return self._play(board)
+
+    def _play(self, board):
+        self.path.clear()
+        move, self.value = self._minimax(self._search_board(board), self.depth, True)
         return move
 
+    @contextlib.contextmanager
+    def _instrumented(self):
+        """
+        Count the search made inside the with block. The counting is done by wrapping the
+        search board's make and unmake, the heuristic and the ordering's cutoff hook for
+        the duration of the move, so the search code itself needs no checks.
+        """
+        stats = SearchStats()
+        search_board = self._search_board
+        get_heuristic_value = self._get_heuristic_value
+        ordering = getattr(self, 'ordering', None)
+        trees = [] # the nodes per ply of each search from the root
+
+        def instrumented_search_board(board):
+            board = search_board(board)
+            plies = [0]
+            tree = [1]
+            trees.append(tree)
+
+            def make(move):
+                plies[0] += 1
+                if plies[0] == len(tree):
+                    tree.append(0)
+                tree[plies[0]] += 1
+                stats.moves += 1
+                if _move_length(move) > 1:
+                    stats.jump_moves += 1
+                SearchBoard.make(board, move)
+
+            def unmake(move):
+                plies[0] -= 1
+                SearchBoard.unmake(board, move)
+
+            board.make = make
+            board.unmake = unmake
+            return board
+
+        def instrumented_heuristic_value(board):
+            stats.leaves += 1
+            return get_heuristic_value(board)
+
+        self._search_board = instrumented_search_board
+        self._get_heuristic_value = instrumented_heuristic_value
+        if ordering is not None:
+            cutoff = ordering.cutoff
+
+            def instrumented_cutoff(move, white, ply, depth, index):
+                stats.count_cutoff(index)
+                cutoff(move, white, ply, depth, index)
+
+            ordering.cutoff = instrumented_cutoff
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            stats.time = time.time() - start_time
+            stats.searches = 1
+            for tree in trees:
+                stats.count_tree(tree)
+            del self._search_board
+            del self._get_heuristic_value
+            if ordering is not None:
+                del ordering.cutoff
+            self.stats = stats
+            self.total_stats.add(stats)
+
     def _minimax(self, board, depth, maximizing_player):
         """See https://en.wikipedia.org/wiki/Minimax#Pseudocode"""
+        hash = board.zobrist_hash(white_to_move=self.white if maximizing_player else not self.white)
+        if hash in self.path:
+            return None, self.DRAW
         if depth == 0 or board.white_has_won() or board.black_has_won():
             return None, self._get_heuristic_value(board)
+        self.path.add(hash)
         if maximizing_player:
             value = float("-inf")
             best = (None, value)
             for move in self._generate_moves(board, self.white):
-                mm = self._minimax(board.move(move), depth - 1, False)
+                board.make(move)
+                mm = self._minimax(board, depth - 1, False)
+                board.unmake(move)
                 if mm[1] > best[1]:
                     best = (move, mm[1])
-            return best
         else:
             value = float("inf")
             best = (None, value)
             for move in self._generate_moves(board, not self.white):
-                mm = self._minimax(board.move(move), depth - 1, True)
+                board.make(move)
+                mm = self._minimax(board, depth - 1, True)
+                board.unmake(move)
                 if mm[1] < best[1]:
                     best = (move, mm[1])
-            return best
+        self.path.remove(hash)
+        return best
 
     def _generate_moves(self, board, white):
         moves = list(board.generate_all_moves(white=white))
@@ -92,60 +303,876 @@ class Minimax:
             random.shuffle(moves)
         return moves
 
+    def _search_board(self, board):
+        """Return a search board for the given board that keeps the heuristic value up to date"""
+        white_values, black_values = self._get_square_values(board.size)
+        return SearchBoard.from_board(board, white_values, black_values)
+
+    def _get_square_values(self, size):
+        """
+        Return the contribution to the heuristic value of a white and of a black piece on
+        each cell, in units of 1 / VALUE_SCALE
+        """
+        geometry = Geometry.of(size)
+        white_distances = geometry.distances(self.metric, geometry.index(size - 1, size - 1))
+        black_distances = geometry.distances(self.metric, geometry.index(0, 0))
+        return ([-round(distance * self.VALUE_SCALE) for distance in white_distances],
+                [round(distance * self.VALUE_SCALE) for distance in black_distances])
+
     def _get_heuristic_value(self, board):
-        value = 0
+        # the search board keeps the value (from white's point of view) up to date as moves are made,
+        # by adding the change in the value of the moved piece's square, so this is O(1)
+        value = board.value / self.VALUE_SCALE
+        return value if self.white else -value
+
+    def __str__(self):
+        if self.metric == 'euclidean':
+            return "Minimax({})".format(self.depth)
+        return "Minimax({}, {})".format(self.depth, self.metric)
 
-        white_target = Hex(board.size - 1, board.size - 1)
-        for piece in board.white_pieces:
-            value -= piece.distance(white_target)
 
-        black_target = Hex(0, 0)
-        for piece in board.black_pieces:
-            value += piece.distance(black_target)
+class TranspositionTable:
+    """A fixed-size table of search results (depth, bound type, value and best move), indexed by Zobrist hash."""
 
-        return value if self.white else -value
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    ENTRY_BYTES = 256 # rough memory used by one stored entry
+
+    def __init__(self, size_mb=16):
+        entries = 1
+        while entries * 2 * self.ENTRY_BYTES <= size_mb * 1024 * 1024:
+            entries *= 2
+        self.mask = entries - 1
+        self.entries = [None] * entries
+        self.generation = 0
+        self.white = None # the player the values are for
+
+    def clear(self):
+        self.entries = [None] * len(self.entries)
+
+    def new_search(self, white):
+        """Start a new search for the given player, clearing the table if it was used by the other player"""
+        if white != self.white:
+            self.clear()
+            self.white = white
+        self.generation += 1
+
+    def probe(self, hash):
+        """Return the (depth, bound, value, move) entry for the given hash, or None if there isn't one"""
+        entry = self.entries[hash & self.mask]
+        if entry is not None and entry[0] == hash:
+            return entry[1:5]
+        return None
+
+    def store(self, hash, depth, bound, value, move):
+        index = hash & self.mask
+        entry = self.entries[index]
+        if entry is None or entry[5] != self.generation or depth >= entry[1]:
+            self.entries[index] = (hash, depth, bound, value, move, self.generation)
+
+
+class MoveOrdering:
+    """Orders the moves at each node of an AlphaBeta search, hash move first, and counts the beta cutoffs."""
+
+    def __init__(self):
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self):
+        """Called at the start of each search"""
+        pass
+
+    def order(self, moves, white, ply, first_move=None):
+        """Reorder the given list of moves for the given player in place"""
+        if first_move is not None and first_move in moves:
+            moves.remove(first_move)
+            moves.insert(0, first_move)
+
+    def cutoff(self, move, white, ply, depth, index):
+        """Record that the move at the given index in the ordered moves caused a beta cutoff"""
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+    def first_move_cutoff_rate(self):
+        """Return the fraction of beta cutoffs that came from the first move searched"""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
 
     def __str__(self):
-        return "Minimax({})".format(self.depth)
+        return "{} ({} cutoffs, {:.0%} on first move)".format(
+            self.__class__.__name__, self.cutoffs, self.first_move_cutoff_rate())
+
+
+def _move_length(move):
+    """Return the number of steps between the start and end of a move"""
+    dq = move.end.q - move.start.q
+    dr = move.end.r - move.start.r
+    return max(abs(dq), abs(dr), abs(dq + dr))
+
+
+class StaticOrdering(MoveOrdering):
+    """Orders moves that go furthest forward first, then longer (jump) moves before shorter ones."""
+
+    def order(self, moves, white, ply, first_move=None):
+        sign = 1 if white else -1
+        moves.sort(key=lambda move: (move == first_move, sign * move.direction(), _move_length(move)), reverse=True)
+
+
+class KillerHistoryOrdering(MoveOrdering):
+    """
+    Orders moves dynamically: the hash move first, then the killer moves (the last
+    moves to cause a cutoff at the same ply), then by the history heuristic (how much
+    each move has caused cutoffs elsewhere in the tree), then as StaticOrdering.
+    """
+
+    KILLERS_PER_PLY = 2
+
+    def __init__(self):
+        super().__init__()
+        self.killers = []
+        self.history = {True: {}, False: {}}
+
+    def new_search(self):
+        self.killers = []
+        # age the history so that it favors recent searches
+        for history in self.history.values():
+            for move in history:
+                history[move] //= 2
+
+    def order(self, moves, white, ply, first_move=None):
+        sign = 1 if white else -1
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history[white]
+        moves.sort(key=lambda move: (move == first_move, move in killers, history.get(move, 0),
+                                     sign * move.direction(), _move_length(move)), reverse=True)
+
+    def cutoff(self, move, white, ply, depth, index):
+        super().cutoff(move, white, ply, depth, index)
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.KILLERS_PER_PLY:]
+        history = self.history[white]
+        history[move] = history.get(move, 0) + depth * depth
+
+
+class SearchAborted(Exception):
+    """Raised inside a search when its time or node budget has run out."""
+
+
+def _run(search):
+    """Run a search generator to the end, through any pauses, and return its result"""
+    while True:
+        try:
+            next(search)
+        except StopIteration as done:
+            return done.value
 
 
 class AlphaBeta(Minimax):
-    def __init__(self, white, depth=2):
-        super().__init__(white, depth)
+    MAX_DEPTH = 64 # deepest iteration when searching to a time or node budget
 
-    def play(self, board):
-        move, value = self._alphabeta(board, self.depth, float("-inf"), float("+inf"), True)
-        return move
+    def __init__(self, white, depth=2, table_mb=16, time_limit=None, node_limit=None, ordering=None,
+                 metric='euclidean', instrument=False):
+        """
+        Search to the given depth, or if a time limit (in seconds per move) or node limit
+        is given, search iteratively deeper until it runs out. Moves are searched in
+        the order given by ordering, which defaults to generation order (apart from the
+        hash move). StaticOrdering or KillerHistoryOrdering prune far more, but may
+        choose differently between equally good moves.
+        """
+        super().__init__(white, depth, metric=metric, instrument=instrument)
+        self.table_mb = table_mb
+        self.table = TranspositionTable(table_mb) if table_mb else None
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.root_depth = depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.completed_depth = 0
+        self.deadline = None
+        self.can_abort = False
+        self.slice_end = float("inf") # the number of nodes at which the search pauses (see search_slices)
+        # the number of repetitions found on the search path: a node whose search finds one
+        # has a value that depends on the path, so it is not stored in the table
+        self.repetitions = 0
+        self.best_move = None # the best move of the last iteration completed
+        self.stop = None # a threading.Event that aborts the search when it is set
+        # if set, called with the depth, value and best move after each iteration, and
+        # then the search always deepens iteratively (to depth, if there is no budget)
+        self.on_iteration = None
+
+    def set_time_control(self, time_limit):
+        """Search for (at most) the given number of seconds per move"""
+        self.time_limit = time_limit
 
-    def _alphabeta(self, board, depth, alpha, beta, maximizing_player):
+    def _play(self, board):
+        return _run(self._search(board))
+
+    def search_slices(self, board, nodes_per_slice=1000):
+        """
+        Search as play does, but as a generator, so that the caller can do other things
+        during a search. It pauses after every nodes_per_slice nodes (give or take one),
+        yielding the depth, value and best move of the last iteration completed and the
+        nodes so far, and returns the move to play. The search deepens iteratively, and
+        only pauses once the first iteration is complete, so there is always a move.
+        """
+        self.slice_end = nodes_per_slice
+        search = self._search(board, deepen=True)
+        try:
+            with self._instrumented() if self.instrument else contextlib.nullcontext():
+                while True:
+                    try:
+                        next(search)
+                    except StopIteration as done:
+                        return done.value
+                    self.slice_end = self.nodes + nodes_per_slice
+                    if self.completed_depth > 0:
+                        yield self.completed_depth, self.value, self.best_move, self.nodes
+        finally:
+            self.slice_end = float("inf")
+
+    def _search(self, board, deepen=False):
+        """
+        Search the board as play does, as a generator which pauses (yielding None) as it
+        enters a node once the nodes reach slice_end, and returns the move to play. The
+        search deepens iteratively if deepen is true, or if it has a budget or on_iteration
+        is set, and otherwise searches to depth at once.
+        """
+        if self.table is not None:
+            self.table.new_search(self.white)
+        self.ordering.new_search()
+        self.nodes = 0
+        budget = self.time_limit is not None or self.node_limit is not None
+        self.deadline = time.time() + self.time_limit if self.time_limit is not None else None
+        first_depth = 1 if deepen or budget or self.on_iteration is not None else self.depth
+        self.best_move = None
+        value = None
+        self.completed_depth = 0
+        for depth in range(first_depth, (self.MAX_DEPTH if budget else self.depth) + 1):
+            # always finish the first iteration, so there is a move to play (unless stopped)
+            self.can_abort = depth > first_depth or self.stop is not None
+            self.root_depth = depth
+            try:
+                # search the previous iteration's best move first
+                self.best_move, value = yield from self._iteration(board, depth, value, self.best_move)
+            except SearchAborted:
+                break
+            finally:
+                self.can_abort = False
+            self.completed_depth = depth
+            self.value = value
+            if self.on_iteration is not None:
+                self.on_iteration(depth, value, self.best_move)
+            if self._out_of_budget():
+                break
+        return self.best_move
+
+    def _iteration(self, board, depth, previous_value, first_move):
+        """Search the board to the given depth, searching first_move first, as a generator (see _search)"""
+        self.path.clear() # an aborted search leaves its path behind
+        return (yield from self._alphabeta_search(self._search_board(board), depth, float("-inf"), float("+inf"),
+                                                  True, first_move))
+
+    def _out_of_budget(self):
+        if self.stop is not None and self.stop.is_set():
+            return True
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            return True
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def _probe(self, hash, depth, alpha, beta, size):
+        """
+        Look the position up in the transposition table, and return the hash move (or None),
+        the window narrowed by the entry, and the entry's value if that decides the position
+        (or None)
+        """
+        entry = self.table.probe(hash)
+        if entry is None:
+            return None, alpha, beta, None
+        entry_depth, bound, entry_value, packed_move = entry
+        hash_move = Move.unpack(packed_move, size) if packed_move is not None else None
+        if entry_depth >= depth:
+            if bound == TranspositionTable.EXACT:
+                return hash_move, alpha, beta, entry_value
+            elif bound == TranspositionTable.LOWER:
+                alpha = max(alpha, entry_value)
+            else:
+                beta = min(beta, entry_value)
+            if alpha >= beta:
+                return hash_move, alpha, beta, entry_value
+        return hash_move, alpha, beta, None
+
+    def _store(self, hash, depth, best, alpha_original, beta_original, size):
+        """Store the best move and value of a position searched with the given window in the transposition table"""
+        if best[1] <= alpha_original:
+            bound = TranspositionTable.UPPER
+        elif best[1] >= beta_original:
+            bound = TranspositionTable.LOWER
+        else:
+            bound = TranspositionTable.EXACT
+        self.table.store(hash, depth, bound, best[1], best[0].pack(size) if best[0] is not None else None)
+
+    def _alphabeta(self, board, depth, alpha, beta, maximizing_player, first_move=None):
+        """Search to the end and return the best move and value (see _alphabeta_search)"""
+        return _run(self._alphabeta_search(board, depth, alpha, beta, maximizing_player, first_move))
+
+    def _alphabeta_search(self, board, depth, alpha, beta, maximizing_player, first_move=None):
         """See https://en.wikipedia.org/wiki/Alpha%E2%80%93beta_pruning#Pseudocode"""
+        if self.nodes >= self.slice_end:
+            yield
+        self.nodes += 1
+        if self.can_abort and self.nodes & 255 == 0 and self._out_of_budget():
+            raise SearchAborted()
+        white = self.white if maximizing_player else not self.white
+        hash = board.zobrist_hash(white_to_move=white)
+        if hash in self.path:
+            self.repetitions += 1
+            return None, self.DRAW
         if depth == 0 or board.white_has_won() or board.black_has_won():
-            return board, self._get_heuristic_value(board)
+            return None, self._get_heuristic_value(board)
+        repetitions = self.repetitions
+        table = self.table
+        hash_move = None
+        if table is not None:
+            hash_move, alpha, beta, value = self._probe(hash, depth, alpha, beta, board.size)
+            if value is not None:
+                return hash_move, value
+            alpha_original, beta_original = alpha, beta
+        moves = list(board.generate_all_moves(white=white))
+        ply = self.root_depth - depth
+        self.ordering.order(moves, white, ply, first_move or hash_move)
+        self.path.add(hash)
         if maximizing_player:
-            value = float("-inf")
-            best = (None, value)
-            for move in board.generate_all_moves(white=self.white):
-                mm = self._alphabeta(board.move(move), depth - 1, alpha, beta, False)
+            best = (None, float("-inf"))
+            for index, move in enumerate(moves):
+                board.make(move)
+                mm = yield from self._alphabeta_search(board, depth - 1, alpha, beta, False)
+                board.unmake(move)
                 if mm[1] > best[1]:
                     best = (move, mm[1])
                 alpha = max(alpha, mm[1])
                 if alpha >= beta:
+                    self.ordering.cutoff(move, white, ply, depth, index)
                     break
-            return best
         else:
-            value = float("inf")
-            best = (None, value)
-            for move in board.generate_all_moves(white=not self.white):
-                mm = self._alphabeta(board.move(move), depth - 1, alpha, beta, True)
+            best = (None, float("inf"))
+            for index, move in enumerate(moves):
+                board.make(move)
+                mm = yield from self._alphabeta_search(board, depth - 1, alpha, beta, True)
+                board.unmake(move)
                 if mm[1] < best[1]:
                     best = (move, mm[1])
                 beta = min(beta, mm[1])
                 if alpha >= beta:
+                    self.ordering.cutoff(move, white, ply, depth, index)
+                    break
+        self.path.remove(hash)
+        if table is not None and self.repetitions == repetitions:
+            self._store(hash, depth, best, alpha_original, beta_original, board.size)
+        return best
+
+    def __str__(self):
+        if self.metric == 'euclidean':
+            return "AlphaBeta({})".format(self.depth)
+        return "AlphaBeta({}, {})".format(self.depth, self.metric)
+
+
+class PVS(AlphaBeta):
+    """A principal variation search (NegaScout) engine, deepening iteratively with aspiration windows."""
+
+    def __init__(self, white, depth=2, aspiration_window=1.0, **kwargs):
+        super().__init__(white, depth, **kwargs)
+        self.aspiration_window = aspiration_window
+        self.pv_table = [[] for _ in range(self.MAX_DEPTH + 1)] # the best line found from each ply
+        self.pv = [] # the best line from the last move played, cut short where the table gave the value
+        self.researches = 0 # re-searches after a null or aspiration window failed
+
+    def _search(self, board, deepen=False):
+        self.researches = 0
+        return (yield from super()._search(board, deepen=True)) # PVS always deepens iteratively
+
+    def _iteration(self, board, depth, previous_value, first_move):
+        """Search the root with a window around the previous value, widening it until the value is inside"""
+        if previous_value is None:
+            alpha, beta = float("-inf"), float("+inf")
+        else:
+            alpha, beta = previous_value - self.aspiration_window, previous_value + self.aspiration_window
+        while True:
+            self.path.clear()
+            move, value = yield from self._pvs_search(self._search_board(board), depth, alpha, beta, True, first_move)
+            if value <= alpha:
+                alpha = float("-inf")
+            elif value >= beta:
+                beta = float("+inf")
+                first_move = move
+            else:
+                self.pv = self.pv_table[0]
+                return move, value
+            self.researches += 1
+
+    def _pvs(self, board, depth, alpha, beta, maximizing_player, first_move=None):
+        """Search to the end and return the best move and value (see _pvs_search)"""
+        return _run(self._pvs_search(board, depth, alpha, beta, maximizing_player, first_move))
+
+    def _pvs_search(self, board, depth, alpha, beta, maximizing_player, first_move=None):
+        if self.nodes >= self.slice_end:
+            yield
+        self.nodes += 1
+        if self.can_abort and self.nodes & 255 == 0 and self._out_of_budget():
+            raise SearchAborted()
+        ply = self.root_depth - depth
+        white = self.white if maximizing_player else not self.white
+        hash = board.zobrist_hash(white_to_move=white)
+        if hash in self.path:
+            self.pv_table[ply] = []
+            self.repetitions += 1
+            return None, self.DRAW
+        if depth == 0 or board.white_has_won() or board.black_has_won():
+            self.pv_table[ply] = []
+            return None, self._get_heuristic_value(board)
+        repetitions = self.repetitions
+        table = self.table
+        hash_move = None
+        if table is not None:
+            hash_move, alpha, beta, value = self._probe(hash, depth, alpha, beta, board.size)
+            if value is not None:
+                self.pv_table[ply] = [hash_move]
+                return hash_move, value
+            alpha_original, beta_original = alpha, beta
+        moves = list(board.generate_all_moves(white=white))
+        self.ordering.order(moves, white, ply, first_move or hash_move)
+        self.path.add(hash)
+        if maximizing_player:
+            best = (None, float("-inf"))
+            for index, move in enumerate(moves):
+                board.make(move)
+                if index == 0:
+                    value = (yield from self._pvs_search(board, depth - 1, alpha, beta, False))[1]
+                else:
+                    # is the move better than alpha?
+                    value = (yield from self._pvs_search(board, depth - 1, alpha, math.nextafter(alpha, math.inf),
+                                                         False))[1]
+                    if alpha < value < beta:
+                        self.researches += 1
+                        value = (yield from self._pvs_search(board, depth - 1, alpha, beta, False))[1]
+                board.unmake(move)
+                if value > best[1]:
+                    best = (move, value)
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    self.ordering.cutoff(move, white, ply, depth, index)
+                    break
+        else:
+            best = (None, float("inf"))
+            for index, move in enumerate(moves):
+                board.make(move)
+                if index == 0:
+                    value = (yield from self._pvs_search(board, depth - 1, alpha, beta, True))[1]
+                else:
+                    # is the move better than beta?
+                    value = (yield from self._pvs_search(board, depth - 1, math.nextafter(beta, -math.inf), beta,
+                                                         True))[1]
+                    if alpha < value < beta:
+                        self.researches += 1
+                        value = (yield from self._pvs_search(board, depth - 1, alpha, beta, True))[1]
+                board.unmake(move)
+                if value < best[1]:
+                    best = (move, value)
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                beta = min(beta, value)
+                if alpha >= beta:
+                    self.ordering.cutoff(move, white, ply, depth, index)
+                    break
+        self.path.remove(hash)
+        if table is not None and self.repetitions == repetitions:
+            self._store(hash, depth, best, alpha_original, beta_original, board.size)
+        return best
+
+    def __str__(self):
+        return "PVS" + super().__str__()[len("AlphaBeta"):]
+
+
+# the engine and shared alpha bound of a ParallelAlphaBeta worker process
+worker_engine = None
+worker_alpha = None
+
+
+def init_search_worker(engine, alpha):
+    global worker_engine, worker_alpha
+    worker_engine = engine
+    worker_engine.table = TranspositionTable(engine.table_mb) if engine.table_mb else None
+    worker_alpha = alpha
+
+
+def search_root_move(search_id, white, board, move, depth, deadline):
+    """
+    Search the given root move in a worker process, starting from the shared alpha bound.
+    Return the move's value (or None if the deadline passed), the alpha it was searched
+    with, and the number of nodes searched.
+    """
+    engine = worker_engine
+    if engine.search_id != search_id:
+        engine.search_id = search_id
+        engine.white = white
+        if engine.table is not None:
+            engine.table.new_search(white)
+        engine.ordering.new_search()
+    engine.nodes = 0
+    engine.root_depth = depth
+    engine.deadline = deadline
+    engine.can_abort = deadline is not None
+    alpha = worker_alpha.value
+    search_board = engine._search_board(board)
+    engine.path = {search_board.zobrist_hash(white)}
+    search_board.make(move)
+    try:
+        _, value = engine._alphabeta(search_board, depth - 1, alpha, float("+inf"), False)
+    except SearchAborted:
+        return None, alpha, engine.nodes
+    with worker_alpha.get_lock():
+        if value > worker_alpha.value:
+            worker_alpha.value = value
+    return value, alpha, engine.nodes
+
+
+class ParallelAlphaBeta(AlphaBeta):
+    """An AlphaBeta engine that splits the moves at the root of the search across worker processes."""
+
+    search_slices = None # the search runs in the worker processes, so it can't be paused
+
+    def __init__(self, white, depth=2, workers=None, **kwargs):
+        super().__init__(white, depth, **kwargs)
+        if self.node_limit is not None:
+            raise ValueError("ParallelAlphaBeta does not support a node limit")
+        if self.instrument:
+            raise ValueError("ParallelAlphaBeta does not support instrumentation")
+        self.workers = workers
+        self.table = None # only the workers search, each with its own table of table_mb
+        self.executor = None
+        self.alpha = None
+        self.search_id = 0
+        self.elapsed = 0.0
+
+    def __getstate__(self):
+        # the pool belongs to this process only
+        state = self.__dict__.copy()
+        state['executor'] = None
+        state['alpha'] = None
+        return state
+
+    def close(self):
+        """Shut down the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def play(self, board):
+        start = time.time()
+        self.search_id += 1
+        self.ordering.new_search()
+        self.nodes = 0
+        if self.time_limit is None:
+            move, self.value = self._search_root(board, self.depth, None)
+            self.completed_depth = self.depth
+        else:
+            deadline = time.time() + self.time_limit
+            move = None
+            self.completed_depth = 0
+            for depth in range(1, self.MAX_DEPTH + 1):
+                # always finish the first iteration, so there is a move to play
+                best_move, value = self._search_root(board, depth, deadline if depth > 1 else None, move)
+                if best_move is None:
+                    break
+                move, self.value = best_move, value
+                self.completed_depth = depth
+                if time.time() >= deadline:
+                    break
+        self.elapsed = time.time() - start
+        return move
+
+    def _search_root(self, board, depth, deadline, first_move=None):
+        """Return the best root move and its value, or None if the deadline passed first"""
+        if self.executor is None:
+            self.alpha = multiprocessing.Value('d', float("-inf"))
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, initializer=init_search_worker, initargs=(self, self.alpha))
+        board = BitBoard.from_board(board)
+        moves = list(board.generate_all_moves(white=self.white))
+        self.ordering.order(moves, self.white, 0, first_move)
+        self.alpha.value = float("-inf")
+        args = (self.search_id, self.white, board)
+        results = [self.executor.submit(search_root_move, *args, moves[0], depth, deadline).result()]
+        futures = [self.executor.submit(search_root_move, *args, move, depth, deadline) for move in moves[1:]]
+        results.extend(future.result() for future in futures)
+        best = (None, None)
+        for move, (value, alpha, nodes) in zip(moves, results):
+            self.nodes += nodes
+            if value is None:
+                return None, None
+            # a value no better than the alpha it was searched with is only an upper bound
+            if value > alpha and (best[1] is None or value > best[1]):
+                best = (move, value)
+        return best
+
+    def measure_speedup(self, board):
+        """
+        Search the given board to this engine's depth with a new engine with the same settings
+        as this one and with a new serial AlphaBeta, and return how many times faster the
+        parallel engine was. The parallel engine's worker processes are started before it is
+        timed. The time limit is left out, as both engines would search until it ran out.
+        """
+        settings = dict(table_mb=self.table_mb, metric=self.metric)
+        serial = AlphaBeta(self.white, self.depth, ordering=self.ordering.__class__(), **settings)
+        parallel = ParallelAlphaBeta(self.white, 1, self.workers, ordering=self.ordering.__class__(), **settings)
+        try:
+            parallel.play(board)
+            parallel.depth = self.depth
+            parallel.play(board)
+        finally:
+            parallel.close()
+        start = time.time()
+        serial.play(board)
+        return (time.time() - start) / parallel.elapsed
+
+    def __str__(self):
+        return "Parallel" + super().__str__()
+
+
+class MCTSNode:
+    """A node in the MCTS tree: a position (as bitmasks) and the move that led to it."""
+
+    __slots__ = ('white', 'black', 'white_to_move', 'move', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, white, black, white_to_move, move=None, parent=None):
+        self.white = white
+        self.black = black
+        self.white_to_move = white_to_move
+        self.move = move # (start, end) cell indices
+        self.parent = parent
+        self.children = []
+        self.untried = None # moves not expanded yet, generated on the first visit
+        self.visits = 0
+        self.wins = 0.0 # for the player who made the move into this node
+
+
+class MCTS:
+    """Monte Carlo Tree Search with UCT selection and random forward playouts."""
+
+    def __init__(self, white, iterations=1000, time_limit=None, exploration=1.4, max_playout_moves=200):
+        self.white = white
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.max_playout_moves = max_playout_moves
+        self.playouts = 0
+        self.playouts_per_second = 0.0
+
+    def set_white(self, white):
+        self.white = white
+
+    def set_time_control(self, time_limit):
+        self.time_limit = time_limit
+
+    def play(self, board):
+        self.playouts = 0
+        board = BitBoard.from_board(board)
+        self.geometry = Geometry.of(board.size)
+        self.white_win = board.white_win
+        self.black_win = board.black_win
+        self.progress = [q + r for q, r in self.geometry.coords]
+        cells = board.cells
+        # play a winning move straight away, since playouts can't tell winning now from winning later
+        for start, end in self._moves(board.white, board.black, self.white):
+            bits = 1 << start | 1 << end
+            if self.white and board.white ^ bits == self.white_win or \
+                    not self.white and board.black ^ bits == self.black_win:
+                return Move(cells[start], cells[end])
+        root = MCTSNode(board.white, board.black, self.white)
+        start = time.time()
+        deadline = start + self.time_limit if self.time_limit is not None else None
+        while True:
+            if deadline is None:
+                if self.playouts >= self.iterations:
                     break
-            return best
+            elif time.time() >= deadline and self.playouts > 0:
+                break
+            node = self._select(root)
+            winner = self._playout(node.white, node.black, node.white_to_move)
+            self._backup(node, winner)
+            self.playouts += 1
+        elapsed = time.time() - start
+        self.playouts_per_second = self.playouts / elapsed if elapsed > 0 else 0.0
+        best = max(root.children, key=lambda child: child.visits)
+        return Move(cells[best.move[0]], cells[best.move[1]])
+
+    def _select(self, node):
+        """Descend the tree by UCT to a node with untried moves, expand one of them and return it"""
+        while True:
+            if self._winner(node.white, node.black) is not None:
+                return node
+            if node.untried is None:
+                node.untried = self._moves(node.white, node.black, node.white_to_move)
+                random.shuffle(node.untried)
+            if node.untried:
+                start, end = node.untried.pop()
+                bits = 1 << start | 1 << end
+                if node.white_to_move:
+                    child = MCTSNode(node.white ^ bits, node.black, False, (start, end), node)
+                else:
+                    child = MCTSNode(node.white, node.black ^ bits, True, (start, end), node)
+                node.children.append(child)
+                return child
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda child: child.wins / child.visits +
+                       self.exploration * math.sqrt(log_visits / child.visits))
+
+    def _backup(self, node, winner):
+        while node is not None:
+            node.visits += 1
+            if winner is None:
+                node.wins += 0.5
+            elif winner != node.white_to_move: # the player who moved into this node won
+                node.wins += 1
+            node = node.parent
+
+    def _winner(self, white, black):
+        if white == self.white_win:
+            return True
+        if black == self.black_win:
+            return False
+        return None
+
+    def _moves(self, white, black, white_to_move, forward_only=False):
+        """Return all the (start, end) moves for the player to move, optionally only forward or sideways ones"""
+        geometry = self.geometry
+        progress = self.progress
+        occupied = white | black
+        moves = []
+        pieces = white if white_to_move else black
+        while pieces:
+            low = pieces & -pieces
+            start = low.bit_length() - 1
+            pieces ^= low
+            for end in geometry.destinations(start, occupied):
+                if forward_only and (progress[end] < progress[start] if white_to_move
+                                     else progress[end] > progress[start]):
+                    continue
+                moves.append((start, end))
+        return moves
+
+    def _playout(self, white, black, white_to_move):
+        """Play random forward moves until someone wins, and return the winner (or None for a draw)"""
+        for _ in range(self.max_playout_moves):
+            winner = self._winner(white, black)
+            if winner is not None:
+                return winner
+            moves = self._moves(white, black, white_to_move, forward_only=True)
+            if not moves:
+                moves = self._moves(white, black, white_to_move)
+            start, end = random.choice(moves)
+            if white_to_move:
+                white ^= 1 << start | 1 << end
+            else:
+                black ^= 1 << start | 1 << end
+            white_to_move = not white_to_move
+        return self._winner(white, black)
 
     def __str__(self):
-        return "AlphaBeta({})".format(self.depth)
+        return "MCTS({})".format(self.iterations)
+
+
+class Ponderer:
+    """Wraps an AlphaBeta (or PVS) engine so that it searches on the opponent's time. Call stop at the end of a game."""
+
+    def __init__(self, engine):
+        if not isinstance(engine, AlphaBeta) or isinstance(engine, ParallelAlphaBeta):
+            raise ValueError("Only AlphaBeta and PVS engines can ponder")
+        self.engine = engine
+        self.thread = None
+        self.stop_event = None
+        self.predicted = None # the position the ponder search is for
+        self.result = None # the ponder search's move, once it has finished
+        self.ponder_pv = []
+        self.pv = [] # the principal variation of the search the last move came from
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def white(self):
+        return self.engine.white
+
+    def set_white(self, white):
+        self.engine.set_white(white)
+
+    def set_time_control(self, time_limit):
+        self.engine.set_time_control(time_limit)
+
+    def play(self, board):
+        move = None
+        if self.thread is not None:
+            if BitBoard.from_board(board) == self.predicted:
+                self.thread.join()
+                move, self.pv = self.result, self.ponder_pv
+                self.hits += 1
+            else:
+                self.stop()
+                self.misses += 1
+            self.thread = None
+        if move is None:
+            move = self.engine.play(board)
+            self.pv = getattr(self.engine, 'pv', [])
+        board = board.move(move)
+        if not board.white_has_won() and not board.black_has_won():
+            self._start(board)
+        return move
+
+    def _start(self, board):
+        """Start pondering on the given board, with the opponent to move"""
+        if len(self.pv) >= 2 and self.pv[1] in set(board.generate_all_moves(not self.engine.white)):
+            reply = self.pv[1]
+        else:
+            reply = Greedy(not self.engine.white).play(board)
+        predicted = board.move(reply)
+        if predicted.white_has_won() or predicted.black_has_won():
+            return
+        engine = copy.copy(self.engine)
+        engine.ordering = copy.deepcopy(self.engine.ordering)
+        engine.path = set()
+        if isinstance(engine, PVS):
+            engine.pv_table = [[] for _ in range(engine.MAX_DEPTH + 1)]
+        engine.instrument = False
+        engine.stop = threading.Event()
+        self.stop_event = engine.stop
+        self.predicted = BitBoard.from_board(predicted)
+        self.result = None
+        self.ponder_pv = []
+        self.thread = threading.Thread(target=self._ponder, args=(engine, predicted), daemon=True)
+        self.thread.start()
+
+    def _ponder(self, engine, board):
+        try:
+            move = engine.play(board)
+        except SearchAborted:
+            return
+        if not engine.stop.is_set():
+            self.result = move
+            self.ponder_pv = getattr(engine, 'pv', [])
+
+    def stop(self):
+        """Stop pondering, and wait for the ponder search to finish"""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def __str__(self):
+        return str(self.engine)
 
 
 class Human:
@@ -222,9 +1249,61 @@ class Human:
         return "Human"
 
 
-def play_interactive(player1, player2, size=7, term=None):
+def set_time_control(players, time_control):
+    """Give the players that support it the given time (in seconds) per move"""
+    if time_control is not None:
+        for player in players:
+            if hasattr(player, 'set_time_control'):
+                player.set_time_control(time_control)
+
+
+async def play_cooperatively(player, board, nodes_per_slice=1000, report=None):
+    """
+    Return the player's move, giving the event loop a turn between slices of the search
+    (see AlphaBeta.search_slices) and passing the progress to report, if it is given.
+    Players without search_slices just play.
+    """
+    if getattr(player, 'search_slices', None) is None:
+        return player.play(board)
+    slices = player.search_slices(board, nodes_per_slice)
+    while True:
+        try:
+            progress = next(slices)
+        except StopIteration as done:
+            return done.value
+        if report is not None:
+            report(*progress)
+        await asyncio.sleep(0)
+
+
+def play_interactive(player1, player2, size=7, term=None, time_control=None, ponder=False):
+    """
+    Play a game on the terminal. If ponder is true, an AlphaBeta or PVS engine playing a
+    Human searches while the Human is thinking (see Ponderer).
+    """
+    asyncio.run(play_interactive_async(player1, player2, size, term, time_control, ponder))
+
+
+async def play_interactive_async(player1, player2, size=7, term=None, time_control=None, ponder=False,
+                                 nodes_per_slice=None, report=None):
+    """
+    Play a game on the terminal, as play_interactive, in an event loop. If nodes_per_slice
+    is given, the engines search cooperatively (see play_cooperatively), so a single-threaded
+    host such as the web build stays responsive, and their progress is passed to report.
+    """
+    async def get_move(player, board):
+        if nodes_per_slice is None:
+            return player.play(board)
+        return await play_cooperatively(player, board, nodes_per_slice, report)
+
     assert player1.white
     assert not player2.white
+    set_time_control((player1, player2), time_control)
+    if ponder:
+        if isinstance(player2, Human) and isinstance(player1, AlphaBeta) and not isinstance(player1, ParallelAlphaBeta):
+            player1 = Ponderer(player1)
+        if isinstance(player1, Human) and isinstance(player2, AlphaBeta) and not isinstance(player2, ParallelAlphaBeta):
+            player2 = Ponderer(player2)
 
     board = Board.start(size=size)
     num_white_moves = 0
@@ -237,40 +1316,46 @@ def play_interactive(player1, player2, size=7, term=None):
             if not isinstance(player1, Human) and not isinstance(player2, Human):
                 with term.cbreak(): # wait for key press
                     inp = term.inkey()
-            move = player1.play(board)
+            move = await get_move(player1, board)
+            jump_path = board.jump_path(move)
             board = board.move(move)
             if not isinstance(player1, Human):
-                animate_move(term, board, move)
+                animate_move(term, board, move, jump_path)
             print(term.move(1, 0) + str(board))
             num_white_moves += 1
             if board.white_has_won():
                 print("White won after {} moves".format(num_white_moves))
                 break
-            move = player2.play(board)
+            move = await get_move(player2, board)
+            jump_path = board.jump_path(move)
             board = board.move(move)
             if not isinstance(player2, Human):
-                animate_move(term, board, move)
+                animate_move(term, board, move, jump_path)
             term.clear()
             print(term.move(1, 0) + str(board))
             num_black_moves += 1
             if board.black_has_won():
                 print("Black won after {} moves".format(num_black_moves))
                 break
+        for player in (player1, player2):
+            if isinstance(player, Ponderer):
+                player.stop()
         with term.cbreak(): # wait for key press
             inp = term.inkey()
 
 
-def animate_move(term, board, move):
+def animate_move(term, board, move, jump_path=None):
+    """Show the move being made, through the given jump path (from the board before the move) if it is a jump"""
     x, y = hex_to_cartesian(move.start)
     print(term.move(y + 1, x) + term.reverse(board.WHITE))
     time.sleep(1)
     print(term.move(y + 1, x) + board.EMPTY)
-    if move.jump_path is None:
+    if jump_path is None:
         x, y = hex_to_cartesian(move.end)
         print(term.move(y + 1, x) + term.reverse(board.WHITE))
         time.sleep(0.5)
     else:
-        for position in move.jump_path:
+        for position in jump_path:
             x, y = hex_to_cartesian(position)
             print(term.move(y + 1, x) + term.reverse(board.WHITE))
             time.sleep(0.5)
@@ -281,63 +1366,190 @@ def hex_to_cartesian(hex):
     return hex.q * 2 + hex.r, hex.r
 
 
-def play_series(player1, player2, size=7, games=1):
-    assert player1.white
-    assert not player2.white
+def play_game(player1, player2, size=7, repetitions=None):
+    """
+    Play a game between player1 (white) and player2 (black), and return the winner (1 or 2,
+    or 0 for a draw) and the number of moves. The game is a draw after 100 moves, or if
+    repetitions is given, as soon as the same position (with the same player to move) has
+    occurred that many times.
+    """
+    board = Board.start(size=size)
+    history = GameHistory(size)
+    num_moves = 0
+    while True:
+        move = player1.play(board)
+        board = board.move(move)
+        if board.white_has_won():
+            return 1, num_moves
+        if repetitions is not None and history.add(board, white_to_move=False) == repetitions:
+            return 0, num_moves
+        move = player2.play(board)
+        board = board.move(move)
+        if board.black_has_won():
+            return 2, num_moves
+        if num_moves >= 100 or repetitions is not None and history.add(board, white_to_move=True) == repetitions:
+            return 0, num_moves
+        num_moves += 1
+
 
+class GameHistory:
+    """The number of times each position has occurred in a game, by Zobrist hash (including the player to move)."""
+
+    def __init__(self, size=7):
+        self.counts = {BitBoard.start(size).zobrist_hash(white_to_move=True): 1}
+
+    def add(self, board, white_to_move):
+        """Record that the position occurred again, and return the number of times it has occurred"""
+        hash = BitBoard.from_board(board).zobrist_hash(white_to_move)
+        count = self.counts.get(hash, 0) + 1
+        self.counts[hash] = count
+        return count
+
+
+def tally(results):
+    """Return player1 wins, player2 wins, draws and the shortest game for the given game results"""
     player1_wins = 0
     player2_wins = 0
     draws = 0
     shortest_game = 100
-    for _ in range(games):
-        board = Board.start(size=size)
-        num_moves = 0
-        while True:
-            move = player1.play(board)
-            board = board.move(move)
-            if board.white_has_won():
-                player1_wins += 1
-                break
-            move = player2.play(board)
-            board = board.move(move)
-            if board.black_has_won():
-                player2_wins += 1
-                break
-            if num_moves >= 100:
-                draws += 1
-                break
-            num_moves += 1
+    for winner, num_moves in results:
+        if winner == 1:
+            player1_wins += 1
+        elif winner == 2:
+            player2_wins += 1
+        else:
+            draws += 1
         if num_moves < shortest_game:
             shortest_game = num_moves
-        print('.', end='', flush=True)
     return player1_wins, player2_wins, draws, shortest_game
 
 
-def play_round_robin(players, size=7, games=1):
+def play_series(player1, player2, size=7, games=1, time_control=None, repetitions=None):
+    assert player1.white
+    assert not player2.white
+    set_time_control((player1, player2), time_control)
+
+    results = []
+    for _ in range(games):
+        results.append(play_game(player1, player2, size, repetitions))
+        print('.', end='', flush=True)
+    return tally(results)
+
+
+def game_seeds(seed, games):
+    """Return a seed for each of the given number of games, derived from a series seed"""
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(games)]
+
+
+def play_seeded_game(player1, player2, size, seed, repetitions=None):
+    """
+    Play a game between fresh copies of player1 (as white) and player2 (as black), with the
+    random number generator seeded first, so the result depends only on the arguments.
+    """
+    player1 = copy.deepcopy(player1)
+    player2 = copy.deepcopy(player2)
+    player1.set_white(True)
+    player2.set_white(False)
+    random.seed(seed)
+    return play_game(player1, player2, size, repetitions)
+
+
+def play_games(games, workers=None):
+    """
+    Play the given (player1, player2, size, seed, repetitions) games on a pool of worker processes, and
+    return the results in the same order. If workers is None there is one worker per CPU,
+    and if it is 0 the games are played in this process.
+    """
+    if workers == 0:
+        results = []
+        for game in games:
+            results.append(play_seeded_game(*game))
+            print('.', end='', flush=True)
+        return results
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_seeded_game, *game) for game in games]
+        results = []
+        for future in futures:
+            results.append(future.result())
+            print('.', end='', flush=True)
+        return results
+
+
+def play_series_parallel(player1, player2, size=7, games=1, time_control=None, workers=None, seed=0,
+                         repetitions=None):
+    """
+    Like play_series, but play the games in parallel on the given number of worker processes.
+    Each game is played by fresh copies of the players with its own seed, so the results are
+    the same whatever the number of workers (as long as the players have no time control).
+    """
+    assert player1.white
+    assert not player2.white
+    set_time_control((player1, player2), time_control)
+    return tally(play_games([(player1, player2, size, s, repetitions) for s in game_seeds(seed, games)], workers))
+
+
+def play_round_robin(players, size=7, games=1, time_control=None, repetitions=None):
     all_results = {}
     for player1, player2 in itertools.combinations(players, 2):
         print(player1, player2)
         player1.white = True
         player2.white = False
-        result1 = play_series(player1, player2, size, games)
+        result1 = play_series(player1, player2, size, games, time_control, repetitions)
         player1.white = False
         player2.white = True
-        result2 = play_series(player2, player1, size, games)
+        result2 = play_series(player2, player1, size, games, time_control, repetitions)
+        all_results[(player1, player2)] = (result1[0] + result2[1], result1[1] + result2[0], result1[2] + result2[2], min(result1[3], result2[3]))
+    print_round_robin(all_results)
+    return all_results
+
+
+def play_round_robin_parallel(players, size=7, games=1, time_control=None, workers=None, seed=0, repetitions=None):
+    """Like play_round_robin, but play all the games of all the pairings in parallel, as play_series_parallel"""
+    set_time_control(players, time_control)
+    pairings = list(itertools.combinations(players, 2))
+    seeds = game_seeds(seed, len(pairings) * games * 2)
+    tasks = []
+    for i, (player1, player2) in enumerate(pairings):
+        offset = i * games * 2
+        tasks.extend((player1, player2, size, s, repetitions) for s in seeds[offset:offset + games])
+        tasks.extend((player2, player1, size, s, repetitions) for s in seeds[offset + games:offset + games * 2])
+    results = play_games(tasks, workers)
+    all_results = {}
+    for i, (player1, player2) in enumerate(pairings):
+        offset = i * games * 2
+        result1 = tally(results[offset:offset + games])
+        result2 = tally(results[offset + games:offset + games * 2])
         all_results[(player1, player2)] = (result1[0] + result2[1], result1[1] + result2[0], result1[2] + result2[2], min(result1[3], result2[3]))
+    print_round_robin(all_results)
+    return all_results
+
+
+def print_round_robin(all_results):
     print()
     for k, v in all_results.items():
         player1 = k[0]
         player2 = k[1]
         print("{} - {}, {}, {}, {}, {}".format(player1, player2, v[0], v[1], v[2], v[3]))
 
+
+async def play_web(report=None):
+    """The game played by the web build (see docs/): a searching engine against a Human, reporting progress"""
+    term = Terminal()
+    await play_interactive_async(AlphaBeta(white=True, depth=4, ordering=KillerHistoryOrdering()),
+                                 Human(white=False, term=term), term=term, nodes_per_slice=500, report=report)
+
+
 if __name__ == '__main__':
     term = Terminal()
     player1 = Greedy(white=True)
     #player2 = Minimax(white=False)
     player2 = Human(white=False, term=term)
     play_interactive(player1, player2, term=term)
+    #play_interactive(PVS(white=True, depth=4), Human(white=False, term=term), term=term, ponder=True)
     #print(play_series(AlphaBeta(white=True, depth=4), AlphaBeta(white=False, depth=3), 7, 1))
     #play_round_robin([Random(white=True), Greedy(white=True, randomize=True), Minimax(white=True, depth=2, randomize=True), AlphaBeta(white=True, depth=3)], games=10)
+    #play_round_robin_parallel([Random(white=True), Greedy(white=True, randomize=True), Minimax(white=True, depth=2, randomize=True), AlphaBeta(white=True, depth=3)], games=10, workers=8)
 
-    # following gets into a loop (odd!)
+    # following used to get into a loop (odd!); play_game can now stop loops with repetitions
     #play_interactive(AlphaBeta(white=True, depth=4), AlphaBeta(white=False, depth=3), term=term)
@@ -0,0 +1,158 @@
+import sys
+
+import numpy as np
+
+from chinesechequers import BitBoard
+from geometry import Geometry
+
+
+class BatchSimulator:
+    """
+    Play many games at once, holding the boards as NumPy arrays.
+
+    Each side of a batch of boards is a (games, cells) bool array, with cells numbered as
+    in Geometry, so boards of any size fit. Moves are found for all the boards at once by
+    shifting whole arrays along the cells: single steps one direction at a time, and jumps by
+    flood filling out from every piece until no new cells are reached. The policies are:
+
+    random -- choose uniformly among all legal moves
+    forward -- choose uniformly among forward (or sideways) moves, like the Random player
+    greedy -- choose the move that most reduces the sum of distances to the target
+        corner, like the Greedy player (ties go to the lowest piece then end cell)
+    """
+
+    POLICIES = ('random', 'forward', 'greedy')
+
+    def __init__(self, size=7, seed=None):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        geometry = Geometry.of(size)
+        self.num_cells = geometry.num_cells
+        board = BitBoard.start(size)
+        self.white_start = self._cells(board.white)
+        self.black_start = self._cells(board.black)
+        self.white_win = self._cells(board.white_win)
+        self.black_win = self._cells(board.black_win)
+        self.num_pieces = bin(board.white).count('1')
+
+        # for each direction: the offset of a neighbor's cell, and the cells whose neighbor
+        # (for a step) or whose neighbor's neighbor (for a jump) is on the board
+        self.directions = []
+        for dq, dr in Geometry.DIRECTIONS:
+            step_mask = np.array([geometry.on_board(q + dq, r + dr) for q, r in geometry.coords])
+            jump_mask = np.array([geometry.on_board(q + 2 * dq, r + 2 * dr) for q, r in geometry.coords])
+            self.directions.append((dq * size + dr, step_mask, jump_mask))
+
+        progress = np.array([q + r for q, r in geometry.coords])
+        # forward[start, end] is true if the move goes forwards (or sideways)
+        self.white_forward = progress[None, :] >= progress[:, None]
+        self.black_forward = progress[None, :] <= progress[:, None]
+        white_distances = np.array(geometry.distances('euclidean', geometry.index(size - 1, size - 1)))
+        black_distances = np.array(geometry.distances('euclidean', geometry.index(0, 0)))
+        # the change in the sum of distances to the target corner for each [start, end] move
+        self.white_cost = white_distances[None, :] - white_distances[:, None]
+        self.black_cost = black_distances[None, :] - black_distances[:, None]
+
+    def _cells(self, bits):
+        """Return a (cells,) bool array of the cells set in a BitBoard bitmask"""
+        return np.array([bits >> i & 1 for i in range(self.num_cells)], dtype=bool)
+
+    @staticmethod
+    def _shift(cells, offset):
+        """Move every cell of a (..., cells) array up by offset cells (or down if it is negative)"""
+        shifted = np.zeros_like(cells)
+        if offset >= 0:
+            shifted[..., offset:] = cells[..., :cells.shape[-1] - offset]
+        else:
+            shifted[..., :offset] = cells[..., -offset:]
+        return shifted
+
+    def pieces(self, own):
+        """Return a (games, pieces) array of the cells of the pieces on each board, lowest first"""
+        return np.nonzero(own)[1].reshape(own.shape[0], self.num_pieces)
+
+    def destinations(self, pieces, occupied):
+        """Return a (games, pieces, cells) bool array of the cells each piece can move to"""
+        games = pieces.shape[0]
+        starts = np.zeros((games, self.num_pieces, self.num_cells), dtype=bool)
+        starts[np.arange(games)[:, None], np.arange(self.num_pieces), pieces] = True
+        occupied = occupied[:, None, :]
+        empty = ~occupied
+        ends = np.zeros_like(starts)
+        for offset, step_mask, _ in self.directions:
+            ends |= self._shift(starts & step_mask, offset)
+        # a jump from a cell needs its neighbor occupied and the cell beyond empty
+        can_jump = [(offset, jump_mask & self._shift(occupied, -offset) & self._shift(empty, -2 * offset))
+                    for offset, _, jump_mask in self.directions]
+        reached = starts
+        new = starts
+        while new.any():
+            jumps = np.zeros_like(starts)
+            for offset, from_cells in can_jump:
+                jumps |= self._shift(new & from_cells, 2 * offset)
+            new = jumps & ~reached
+            reached = reached | new
+        return (ends & empty) | (reached & ~starts)
+
+    def choose(self, policy, pieces, ends, white):
+        """Return the start and end cells of the move chosen by the policy on each board"""
+        games = pieces.shape[0]
+        moves = ends # [game, piece, end cell]
+        if policy == 'random' or policy == 'forward':
+            candidates = moves
+            if policy == 'forward':
+                forward = moves & (self.white_forward if white else self.black_forward)[pieces]
+                # fall back to any move on boards with no forward move
+                candidates = np.where(forward.any(axis=(1, 2))[:, None, None], forward, moves)
+            scores = np.where(candidates, self.rng.random(moves.shape), -1.0)
+            chosen = scores.reshape(games, -1).argmax(axis=1)
+        elif policy == 'greedy':
+            costs = np.where(moves, (self.white_cost if white else self.black_cost)[pieces], np.inf)
+            chosen = costs.reshape(games, -1).argmin(axis=1)
+        else:
+            raise ValueError("Unknown policy " + policy)
+        piece, end = np.divmod(chosen, self.num_cells)
+        return pieces[np.arange(games), piece], end
+
+    def play(self, white_policy, black_policy, games=1000, max_moves=100):
+        """
+        Play the given number of games between the policies, with the same move limit as
+        play_series, and return the number of white wins, black wins and draws, and an
+        array of the number of moves in each game.
+        """
+        white = np.tile(self.white_start, (games, 1))
+        black = np.tile(self.black_start, (games, 1))
+        winner = np.zeros(games, dtype=int) # 1 or 2 for a white or black win, 0 for a draw
+        lengths = np.full(games, max_moves, dtype=int)
+        active = np.arange(games)
+        for num_moves in range(max_moves + 1):
+            for own, policy, player, win in ((white, white_policy, 1, self.white_win),
+                                             (black, black_policy, 2, self.black_win)):
+                if len(active) == 0:
+                    break
+                pieces = self.pieces(own[active])
+                ends = self.destinations(pieces, white[active] | black[active])
+                start, end = self.choose(policy, pieces, ends, player == 1)
+                own[active, start] = False
+                own[active, end] = True
+                won = (own[active] == win).all(axis=1)
+                winner[active[won]] = player
+                lengths[active[won]] = num_moves
+                active = active[~won]
+        return (int((winner == 1).sum()), int((winner == 2).sum()), int((winner == 0).sum()), lengths)
+
+
+def simulate(white_policy, black_policy, games=1000, size=7, seed=None, max_moves=100):
+    """Play a batch of games between two policies and return the outcomes, as BatchSimulator.play"""
+    return BatchSimulator(size, seed).play(white_policy, black_policy, games, max_moves)
+
+
+if __name__ == '__main__':
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for white_policy, black_policy in (('random', 'random'), ('forward', 'forward'),
+                                       ('forward', 'greedy'), ('greedy', 'forward')):
+        white_wins, black_wins, draws, lengths = simulate(white_policy, black_policy, games, seed=42)
+        decided = lengths[lengths < 100]
+        print("{} - {}: {} white wins, {} black wins, {} draws, median decided game {} moves".format(
+            white_policy, black_policy, white_wins, black_wins, draws,
+            int(np.median(decided)) if len(decided) else '-'))
@@ -1,7 +1,32 @@
+import asyncio
+import json
 import random
+import zipfile
+import time
 
+import numpy as np
+import pytest
+
+from bench import PERFT, positions
+from build import BUNDLE, WEB_FILES, build, bundle_bytes
 from chinesechequers import *
+from engine import AsyncEngine, Limits
+from geometry import Geometry
+from perft import divide, perft
 from play import *
+from simulate import BatchSimulator, simulate
+from tournament import Tournament, elo_difference, sprt_bounds, sprt_llr
+
+
+def random_position(seed, plies, board=None):
+    """Return the board after the given number of random moves from the start, and whether white is to move"""
+    random.seed(seed)
+    board = Board.start(7) if board is None else board
+    white = True
+    for _ in range(plies):
+        board = board.move(random.choice(list(board.generate_all_moves(white))))
+        white = not white
+    return board, white
 
 
 def test_hex():
@@ -20,6 +45,38 @@ def test_neighbor_pairs():
     ]
 
 
+def test_geometry_matches_neighbor_pairs():
+    for size in (7, 9):
+        geometry = Geometry.of(size)
+        board = Board.start(size)
+        for index, (q, r) in enumerate(geometry.coords):
+            pairs = [(n1, n2) for n1, n2 in Hex(q, r).neighbor_pairs() if board.on_board(n1)]
+            assert [geometry.coords[n] for n in geometry.neighbors[index]] == [(n1.q, n1.r) for n1, _ in pairs]
+            assert [(geometry.coords[n1], geometry.coords[n2]) for n1, n2 in geometry.jumps[index]] == \
+                [((n1.q, n1.r), (n2.q, n2.r)) for n1, n2 in pairs if board.on_board(n2)]
+    assert Geometry.of(9) is Geometry.of(9)
+    assert len(Geometry.of(9).neighbors[0]) == 2
+    assert len(Geometry.of(9).jumps[Geometry.of(9).index(4, 4)]) == 6
+
+
+def test_geometry_distances():
+    geometry = Geometry.of(7)
+    target = geometry.index(6, 6)
+    euclidean = geometry.distances('euclidean', target)
+    hex_steps = geometry.distances('hex', target)
+    hops = geometry.distances('hops', target)
+    assert geometry.distances('hex', target) is hex_steps
+    for index, (q, r) in enumerate(geometry.coords):
+        assert euclidean[index] == Hex(q, r).distance(Hex(6, 6))
+        assert (hex_steps[index] + 1) // 2 <= hops[index] <= hex_steps[index]
+    assert hex_steps[geometry.index(0, 0)] == 12
+    assert hops[geometry.index(0, 0)] == 6
+    assert hex_steps[geometry.index(0, 6)] == 6
+    assert hops[geometry.index(5, 6)] == 1
+    with pytest.raises(ValueError):
+        geometry.distances('manhattan', target)
+
+
 def test_board_str():
     assert str(Board.start(7)).strip() == """
 ○ ○ ○ · · · · 
@@ -70,6 +127,24 @@ def test_generate_moves_double_jump():
     assert [m.end for m in board.generate_moves(Hex(0, 0))] == [Hex(2, 0), Hex(2, 2), Hex(4, 0)]
 
 
+def test_jump_paths():
+    board = Board.start(7).move(Move(Hex(2, 0), Hex(3, 0))).move(Move(Hex(1, 1), Hex(2, 1)))
+    jump_paths = {m.end: board.jump_path(m) for m in board.generate_moves(Hex(0, 0))}
+    assert jump_paths == {
+        Hex(2, 0): (Hex(0, 0), Hex(2, 0)),
+        Hex(2, 2): (Hex(0, 0), Hex(2, 0), Hex(2, 2)),
+        Hex(4, 0): (Hex(0, 0), Hex(2, 0), Hex(4, 0)),
+    }
+    bitboard = BitBoard.from_board(board)
+    assert {m.end: bitboard.jump_path(m) for m in bitboard.generate_moves(Hex(0, 0))} == jump_paths
+    assert board.jump_path(Move(Hex(3, 0), Hex(4, 0))) is None
+    assert bitboard.jump_path(Move(Hex(3, 0), Hex(4, 0))) is None
+    with pytest.raises(ValueError):
+        board.jump_path(Move(Hex(0, 0), Hex(4, 4)))
+    with pytest.raises(ValueError):
+        bitboard.jump_path(Move(Hex(0, 0), Hex(4, 4)))
+
+
 def test_generate_boards():
     board = Board.start(7)
     assert len(list(board.generate_boards(white=True))) == 10
@@ -84,6 +159,116 @@ def test_winning_position():
     assert board.black_has_won()
 
 
+def test_bitboard_str():
+    assert str(BitBoard.start(7)) == str(Board.start(7))
+
+
+def test_bitboard_generate_moves():
+    board = Board.start(7).move(Move(Hex(2, 0), Hex(3, 0))).move(Move(Hex(1, 1), Hex(2, 1)))
+    bitboard = BitBoard.from_board(board)
+    assert [m.end for m in bitboard.generate_moves(Hex(0, 0))] == [Hex(2, 0), Hex(2, 2), Hex(4, 0)]
+    assert len(list(BitBoard.start(7).generate_boards(white=True))) == 10
+
+
+def test_bitboard_matches_board():
+    random.seed(42)
+    board = Board.start(7)
+    bitboard = BitBoard.start(7)
+    white = True
+    for _ in range(50):
+        moves = list(board.generate_all_moves(white))
+        assert set(moves) == set(bitboard.generate_all_moves(white))
+        move = random.choice(moves)
+        board = board.move(move)
+        bitboard = bitboard.move(move)
+        assert bitboard.white_pieces == board.white_pieces
+        assert bitboard.black_pieces == board.black_pieces
+        white = not white
+    assert BitBoard.from_board(board) == bitboard
+    assert bitboard.to_board().white_pieces == board.white_pieces
+
+
+def test_bitboard_winning_position():
+    board = BitBoard.start(7)
+    assert not board.white_has_won()
+    assert not board.black_has_won()
+    board = BitBoard(board.black, board.white, board.size, board.white_win, board.black_win)
+    assert board.white_has_won()
+    assert board.black_has_won()
+
+
+def test_search_board_make_unmake():
+    random.seed(42)
+    white_values = [q + r for q in range(7) for r in range(7)]
+    black_values = [-q - r for q in range(7) for r in range(7)]
+    board = SearchBoard.from_board(Board.start(7), white_values, black_values)
+    start = board.snapshot()
+    start_value = board.value
+    assert start_value == sum(q + r for q, r in ((0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (2, 0))) * 2 - 12 * 6
+    moves = []
+    white = True
+    for _ in range(20):
+        move = random.choice(list(board.generate_all_moves(white)))
+        board.make(move)
+        moves.append(move)
+        assert board.value == SearchBoard.from_board(board, white_values, black_values).value
+        white = not white
+    for move in reversed(moves):
+        board.unmake(move)
+    assert board == start
+    assert board.value == start_value
+    # the players' values stay exact, so the symmetric start is an exact tie
+    player = Minimax(white=True)
+    board = player._search_board(Board.start(7))
+    assert player._get_heuristic_value(board) == 0
+    for _ in range(200):
+        board.make(random.choice(list(board.generate_all_moves(white))))
+        assert board.value == player._search_board(board).value
+        white = not white
+
+
+def test_zobrist_hash():
+    random.seed(42)
+    board = SearchBoard.from_board(Board.start(7))
+    assert board.zobrist_hash() == BitBoard.start(7).zobrist_hash()
+    assert board.zobrist_hash(white_to_move=False) != board.zobrist_hash(white_to_move=True)
+    white = True
+    for _ in range(20):
+        board.make(random.choice(list(board.generate_all_moves(white))))
+        assert board.zobrist_hash() == board.snapshot().zobrist_hash()
+        white = not white
+
+
+def test_transposition_table():
+    table = TranspositionTable(size_mb=1)
+    assert len(table.entries) == 4096
+    table.new_search(white=True)
+    table.store(42, 3, TranspositionTable.EXACT, 1.5, None)
+    assert table.probe(42) == (3, TranspositionTable.EXACT, 1.5, None)
+    assert table.probe(42 + len(table.entries)) is None
+    # shallower results don't replace deeper ones from the same search...
+    table.store(42 + len(table.entries), 2, TranspositionTable.LOWER, 0.5, None)
+    assert table.probe(42) is not None
+    # ...but do replace ones from an earlier search
+    table.new_search(white=True)
+    table.store(42 + len(table.entries), 2, TranspositionTable.LOWER, 0.5, None)
+    assert table.probe(42) is None
+    # the table is cleared when used for the other player
+    table.new_search(white=False)
+    assert table.probe(42 + len(table.entries)) is None
+
+
+def test_alphabeta_transposition_table_value():
+    board, white = random_position(42, 10)
+    for depth in (2, 3):
+        player1 = AlphaBeta(white=True, depth=depth, table_mb=0)
+        player2 = AlphaBeta(white=True, depth=depth)
+        player2.table.new_search(white=True)
+        _, value1 = player1._alphabeta(player1._search_board(board), depth, float("-inf"), float("+inf"), True)
+        _, value2 = player2._alphabeta(player2._search_board(board), depth, float("-inf"), float("+inf"), True)
+        assert value1 == pytest.approx(value2)
+
+
 def test_random_vs_greedy():
     random.seed(42)
     player1 = Random(white=True)
@@ -133,3 +318,539 @@ def test_greedy_vs_alphabeta():
     assert player2_wins == 1
     assert draws == 0
     assert shortest_game == 23
+
+
+def test_alphabeta_iterative_deepening():
+    board = Board.start(7)
+    # a tiny budget still completes the first iteration
+    player = AlphaBeta(white=True, time_limit=0.000001)
+    assert player.play(board) in set(board.generate_all_moves(white=True))
+    assert player.completed_depth == 1
+    player = AlphaBeta(white=True, node_limit=5000)
+    assert player.play(board) in set(board.generate_all_moves(white=True))
+    assert player.completed_depth >= 2
+    assert player.nodes < 5000 + 256
+
+
+def test_play_series_time_control():
+    player1 = AlphaBeta(white=True)
+    player2 = Greedy(white=False)
+    player1_wins, player2_wins, draws, shortest_game = play_series(player1, player2, games=1, time_control=0.05)
+    assert player1.time_limit == 0.05
+    assert player1_wins + player2_wins + draws == 1
+
+
+def test_move_ordering():
+    board = Board.start(7)
+    moves = list(board.generate_all_moves(white=True))
+    StaticOrdering().order(moves, True, 0)
+    assert [m.direction() for m in moves] == sorted([m.direction() for m in moves], reverse=True)
+    assert moves[0] in (Move(Hex(0, 1), Hex(0, 3)), Move(Hex(0, 1), Hex(2, 1)),
+                        Move(Hex(1, 0), Hex(1, 2)), Move(Hex(1, 0), Hex(3, 0)))
+    ordering = KillerHistoryOrdering()
+    ordering.cutoff(Move(Hex(0, 2), Hex(0, 3)), True, 0, 2, 3)
+    ordering.order(moves, True, 0)
+    assert moves[0] == Move(Hex(0, 2), Hex(0, 3))
+    assert ordering.cutoffs == 1
+    assert ordering.first_move_cutoffs == 0
+
+
+def test_alphabeta_move_ordering():
+    board, white = random_position(42, 10)
+    player1 = AlphaBeta(white=True, depth=3, table_mb=0)
+    player2 = AlphaBeta(white=True, depth=3, table_mb=0, ordering=KillerHistoryOrdering())
+    _, value1 = player1._alphabeta(player1._search_board(board), 3, float("-inf"), float("+inf"), True)
+    _, value2 = player2._alphabeta(player2._search_board(board), 3, float("-inf"), float("+inf"), True)
+    assert value1 == pytest.approx(value2)
+    assert player2.ordering.first_move_cutoff_rate() > player1.ordering.first_move_cutoff_rate()
+
+
+def test_greedy_incremental_cost():
+    board = Board.start(7).move(Move(Hex(2, 0), Hex(3, 0))).move(Move(Hex(4, 6), Hex(3, 6)))
+    for white, target in ((True, Hex(6, 6)), (False, Hex(0, 0))):
+        player = Greedy(white=white)
+        for move in board.generate_all_moves(white):
+            new_board = board.move(move)
+            cost = sum(piece.distance(target) for piece in (new_board.white_pieces if white else new_board.black_pieces))
+            assert player._get_cost(board, move) == pytest.approx(cost)
+
+
+def test_metrics():
+    board = Board.start(7)
+    for metric in Geometry.METRICS:
+        for player in (Greedy(white=True, metric=metric), AlphaBeta(white=True, metric=metric)):
+            assert player.play(board) in set(board.generate_all_moves(white=True))
+    assert str(Greedy(white=True, metric='hops')) == "Greedy(hops)"
+    assert str(AlphaBeta(white=True, depth=3, metric='hex')) == "AlphaBeta(3, hex)"
+
+
+def test_play_series_parallel():
+    player1 = Random(white=True)
+    player2 = Greedy(white=False, randomize=True)
+    results = [play_series_parallel(player1, player2, games=6, workers=workers, seed=7) for workers in (0, 1, 3)]
+    assert results[0] == results[1] == results[2]
+    player1_wins, player2_wins, draws, shortest_game = results[0]
+    assert player1_wins + player2_wins + draws == 6
+    assert play_series_parallel(player1, player2, games=6, workers=0, seed=8) != results[0]
+
+
+def test_play_round_robin_parallel():
+    players = [Random(white=True), Greedy(white=True, randomize=True), Minimax(white=True, depth=1)]
+    results = play_round_robin_parallel(players, games=2, workers=2)
+    assert list(results) == [(players[0], players[1]), (players[0], players[2]), (players[1], players[2])]
+    for player1_wins, player2_wins, draws, shortest_game in results.values():
+        assert player1_wins + player2_wins + draws == 4
+    assert results == play_round_robin_parallel(players, games=2, workers=0)
+
+
+def test_parallel_alphabeta():
+    board, white = random_position(42, 10)
+    serial = AlphaBeta(white=True, depth=3)
+    _, value = serial._alphabeta(serial._search_board(board), 3, float("-inf"), float("+inf"), True)
+    player = ParallelAlphaBeta(white=True, depth=3, workers=2)
+    assert player.table is None # the workers have the tables
+    try:
+        move = player.play(board)
+        assert move in set(board.generate_all_moves(white=True))
+        assert player.value == pytest.approx(value)
+        player.set_time_control(0.1)
+        assert player.play(board) in set(board.generate_all_moves(white=True))
+        assert player.completed_depth >= 1
+    finally:
+        player.close()
+    assert str(player) == "ParallelAlphaBeta(3)"
+    # a time limit is left out of the comparison, so it doesn't just time the limit twice
+    player.set_time_control(5)
+    start = time.time()
+    assert player.measure_speedup(Board.start(7)) > 0
+    assert time.time() - start < 5
+
+
+def test_mcts():
+    random.seed(42)
+    board = Board.start(7)
+    player = MCTS(white=True, iterations=50)
+    assert player.play(board) in set(board.generate_all_moves(white=True))
+    assert player.playouts == 50
+    assert player.playouts_per_second > 0
+    # one move from winning
+    start = Board.start(7)
+    white_pieces = start.white_win - {Hex(5, 5)} | {Hex(4, 5)}
+    black_pieces = [Hex(0, 3), Hex(0, 4), Hex(1, 3), Hex(1, 4), Hex(2, 3), Hex(3, 2)]
+    board = Board(white_pieces, black_pieces, 7, start.white_win, start.black_win)
+    assert board.move(MCTS(white=True, iterations=200).play(board)).white_has_won()
+
+
+def test_batch_simulator_moves():
+    random.seed(42)
+    for size in (7, 9):
+        simulator = BatchSimulator(size, seed=42)
+        boards = []
+        board = BitBoard.start(size)
+        white = True
+        for _ in range(30):
+            boards.append((board, white))
+            board = board.move(random.choice(list(board.generate_all_moves(white))))
+            white = not white
+
+        def cells(bits):
+            return [bool(bits >> i & 1) for i in range(size * size)]
+
+        own = np.array([cells(board.white if white else board.black) for board, white in boards])
+        occupied = np.array([cells(board.white | board.black) for board, white in boards])
+        pieces = simulator.pieces(own)
+        ends = simulator.destinations(pieces, occupied)
+        for (board, white), board_pieces, board_ends in zip(boards, pieces, ends):
+            moves = {(int(piece), int(end)) for piece, piece_ends in zip(board_pieces, board_ends)
+                     for end in np.nonzero(piece_ends)[0]}
+            assert moves == {(m.start.q * size + m.start.r, m.end.q * size + m.end.r)
+                             for m in board.generate_all_moves(white)}
+
+
+def test_simulate():
+    white_wins, black_wins, draws, lengths = simulate('forward', 'greedy', games=100, seed=42)
+    assert white_wins + black_wins + draws == 100
+    assert black_wins > 50 * white_wins
+    assert len(lengths) == 100
+    assert simulate('random', 'random', games=20, seed=42)[2] == 20
+    assert simulate('forward', 'greedy', games=100, seed=42)[:3] == (white_wins, black_wins, draws)
+    white_wins, black_wins, draws, lengths = simulate('greedy', 'forward', games=20, size=9, seed=42)
+    assert white_wins + black_wins + draws == 20
+    assert len(lengths) == 20
+
+
+def test_perft():
+    for name, board in positions().items():
+        for depth, expected in enumerate(PERFT[name][:2], 1):
+            assert perft(board, depth) == expected
+            assert perft(BitBoard.from_board(board), depth) == expected
+        assert perft(SearchBoard.from_board(board), 3) == PERFT[name][2]
+        assert perft(SearchBoard.from_board(board), 3, hashing=True) == PERFT[name][2]
+    board = Board.start(7)
+    counts = divide(board, 3)
+    assert set(counts) == set(board.generate_all_moves(True))
+    assert sum(counts.values()) == perft(board, 3)
+    # a won position has no moves
+    start = Board.start(7)
+    won = Board(start.white_win, [Hex(0, 3), Hex(0, 4), Hex(1, 3), Hex(1, 4), Hex(2, 3), Hex(3, 2)],
+                7, start.white_win, start.black_win)
+    assert perft(won, 0) == 1
+    assert perft(won, 2) == 0
+
+
+def test_search_stats():
+    board = positions()['midgame']
+    player = Minimax(white=True, depth=2, instrument=True)
+    move = player.play(board)
+    assert move == Minimax(white=True, depth=2).play(board)
+    stats = player.stats
+    assert stats.nodes_per_ply == [1, PERFT['midgame'][0], PERFT['midgame'][1]]
+    assert stats.leaves == PERFT['midgame'][1]
+    assert stats.cutoffs == 0
+    assert 0 < stats.jump_share() < 1
+    assert stats.time > 0
+    assert stats.trees == 1
+    assert stats.branching_factor() == pytest.approx(PERFT['midgame'][1] ** 0.5)
+    # under iterative deepening each iteration is a tree of its own
+    player = AlphaBeta(white=True, depth=3, instrument=True)
+    player.on_iteration = lambda depth, value, move: None
+    player.play(board)
+    assert player.stats.trees == 3
+    assert player.stats.nodes_per_ply[0] == 3
+    assert player.stats.nodes == player.nodes
+    assert 1 < player.stats.branching_factor() < PERFT['midgame'][0]
+    player = AlphaBeta(white=True, depth=3, instrument=True)
+    assert player.play(board) == AlphaBeta(white=True, depth=3).play(board)
+    assert player.stats.nodes == player.nodes
+    assert player.stats.cutoffs == player.ordering.cutoffs
+    assert player.stats.first_move_cutoff_rate() == player.ordering.first_move_cutoff_rate()
+    assert 1 < player.stats.branching_factor() < PERFT['midgame'][0]
+    # the wrappers are removed after each move
+    assert '_search_board' not in player.__dict__
+    assert 'cutoff' not in player.ordering.__dict__
+    # stats add up over a series
+    player1 = AlphaBeta(white=True, depth=2, instrument=True)
+    play_series(player1, Greedy(white=False), games=2)
+    assert player1.total_stats.searches == 62
+    assert player1.total_stats.nodes > player1.stats.nodes
+    # a root found in the transposition table is not a tree, as nothing is searched below it
+    assert 0 < player1.total_stats.trees <= player1.total_stats.searches
+    assert Minimax(white=True).total_stats.searches == 0
+
+
+def test_elo_difference():
+    assert elo_difference(5, 5, 2) == (0.0, elo_difference(5, 5, 2)[1])
+    difference, margin = elo_difference(30, 10, 10)
+    assert difference == pytest.approx(-elo_difference(10, 30, 10)[0])
+    assert 0 < difference - margin < difference + margin
+    assert elo_difference(40, 20, 0)[1] < elo_difference(20, 10, 0)[1]
+    assert elo_difference(10, 0, 0) == (float("inf"), float("inf"))
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert lower == -upper
+    assert sprt_llr(20, 20, 10, -100, 100) == 0
+    assert sprt_llr(30, 10, 10, -100, 100) > upper
+    assert sprt_llr(10, 30, 10, -100, 100) < lower
+
+
+def test_tournament():
+    players = [Random(white=True), Greedy(white=True), AlphaBeta(white=True, depth=2)]
+    tournament = Tournament(players, min_games=4, workers=0)
+    tournament.run(100)
+    random_greedy, random_alphabeta, greedy_alphabeta = tournament.pairings
+    # the lopsided pairings stop after the minimum number of games
+    assert random_greedy.decision is players[1]
+    assert random_greedy.games == 4
+    assert random_alphabeta.decision is players[2]
+    assert greedy_alphabeta.decision is players[2]
+    assert tournament.games_played == sum(pairing.games for pairing in tournament.pairings)
+    ratings = tournament.ratings()
+    assert ratings[players[2]] > ratings[players[1]] > ratings[players[0]]
+    assert sum(ratings.values()) == pytest.approx(0)
+    # the budget is never exceeded
+    tournament = Tournament([Random(white=True), Random(white=True)], workers=0)
+    tournament.run(6)
+    assert tournament.games_played == 6
+    assert tournament.undecided()
+
+
+def test_move_pack():
+    board = Board.start(7)
+    moves = list(board.generate_all_moves(True))
+    packed = [move.pack(7) for move in moves]
+    assert len(set(packed)) == len(moves)
+    assert all(0 <= p < 49 * 49 for p in packed)
+    assert [Move.unpack(p, 7) for p in packed] == moves
+    assert hash(Move.unpack(packed[0], 7)) == hash(moves[0])
+    assert not hasattr(moves[0], '__dict__')
+    assert not hasattr(Hex(0, 0), '__dict__')
+
+
+def test_symmetry():
+    board, white = random_position(3, 20, BitBoard.start(7))
+    canonical, transform = board.canonical(white)
+    for t in range(4):
+        transformed = board.transform(t)
+        transformed_white = not white if t & Geometry.ROTATE else white
+        assert transformed.transform(t) == board
+        assert perft(transformed, 2, transformed_white) == perft(board, 2, white)
+        moves = list(board.generate_all_moves(white))
+        assert {move.transform(t, 7) for move in moves} == set(transformed.generate_all_moves(transformed_white))
+        assert transformed.canonical(transformed_white)[0] == canonical
+    # moves in the canonical position map back to moves in the original one
+    moves = {move.transform(transform, 7) for move in canonical.generate_all_moves(True)}
+    assert moves == set(board.generate_all_moves(white))
+    start = BitBoard.start(7)
+    assert start.transform(Geometry.ROTATE) == start
+    assert start.transform(Geometry.ROTATE).white_win == start.white_win
+    assert start.canonical(False) == (start, Geometry.ROTATE)
+
+
+def test_pvs():
+    for name, board in positions().items():
+        minimax = Minimax(white=True, depth=3)
+        move, value = minimax._minimax(minimax._search_board(board), 3, True)
+        player = PVS(white=True, depth=3)
+        assert player.play(board) == player.pv[0]
+        assert player.value == pytest.approx(value)
+        assert len(player.pv) == 3
+        # the principal variation is a legal line of play
+        white = True
+        for move in player.pv:
+            assert move in set(board.generate_all_moves(white))
+            board = board.move(move)
+            white = not white
+    board = positions()['endgame']
+    alphabeta = AlphaBeta(white=True, depth=4)
+    alphabeta.play(board)
+    player = PVS(white=True, depth=4)
+    player.play(board)
+    assert player.nodes < alphabeta.nodes
+    player = PVS(white=False, node_limit=2000)
+    assert player.play(Board.start(7)) in set(Board.start(7).generate_all_moves(False))
+    assert player.completed_depth >= 2
+    assert str(PVS(white=True, depth=3)) == "PVS(3)"
+
+
+class BackAndForth:
+    """A player that moves a piece forwards and back again"""
+
+    def __init__(self, white, move):
+        self.white = white
+        self.moves = [move, Move(move.end, move.start)]
+        self.num_moves = 0
+
+    def play(self, board):
+        move = self.moves[self.num_moves % 2]
+        self.num_moves += 1
+        return move
+
+
+def test_repetitions():
+    def players():
+        return BackAndForth(True, Move(Hex(2, 0), Hex(3, 0))), BackAndForth(False, Move(Hex(4, 6), Hex(3, 6)))
+    assert play_game(*players()) == (0, 100)
+    assert play_game(*players(), repetitions=3) == (0, 3)
+    assert play_series(*players(), games=2, repetitions=2) == (0, 0, 2, 1)
+    history = GameHistory(7)
+    board = Board.start(7)
+    assert history.add(board, white_to_move=False) == 1
+    assert history.add(board, white_to_move=True) == 2
+    # a position repeated on the search path is a draw
+    player = Minimax(white=True, depth=2)
+    player.play(board)
+    assert not player.path
+    search_board = player._search_board(board)
+    player.path.add(search_board.zobrist_hash(white_to_move=True))
+    assert player._minimax(search_board, 2, True) == (None, Minimax.DRAW)
+    for player in (AlphaBeta(white=True, depth=2), PVS(white=True, depth=2)):
+        player.play(board)
+        assert not player.path
+        player.path.add(search_board.zobrist_hash(white_to_move=True))
+        search = player._pvs if isinstance(player, PVS) else player._alphabeta
+        assert search(search_board, 2, float("-inf"), float("inf"), True) == (None, Minimax.DRAW)
+    # a value that depends on a repetition is not stored in the transposition table, as the
+    # repetition won't be on the path when the position is reached another way
+    board = positions()['endgame'] # where white is ahead, so black would take a draw
+    principal = PVS(white=True, depth=3)
+    principal.play(board)
+    white_move, black_move = principal.pv[:2]
+    for cls in (AlphaBeta, PVS):
+        player = cls(white=True, depth=3)
+        search = player._pvs if isinstance(player, PVS) else player._alphabeta
+        search_board = player._search_board(board)
+        search_board.make(white_move)
+        search_board.make(black_move)
+        player.path.add(search_board.zobrist_hash(white_to_move=True))
+        search_board.unmake(black_move)
+        search_board.unmake(white_move)
+        repeated = search(search_board, 3, float("-inf"), float("inf"), True)
+        player.path.clear()
+        expected = cls(white=True, depth=3)
+        assert repeated != expected._alphabeta(expected._search_board(board), 3, float("-inf"), float("inf"), True)
+        assert search(search_board, 3, float("-inf"), float("inf"), True) == \
+            expected._alphabeta(expected._search_board(board), 3, float("-inf"), float("inf"), True)
+
+
+def test_ponderer():
+    player = Ponderer(AlphaBeta(white=True, depth=3))
+    opponent = Greedy(white=False)
+    board = Board.start(7)
+    for _ in range(5):
+        move = player.play(board)
+        assert move in set(board.generate_all_moves(True))
+        board = board.move(move)
+        board = board.move(opponent.play(board))
+    # pondering predicts Greedy's replies
+    assert player.hits == 4
+    assert player.misses == 0
+    # a deep ponder search can be stopped straight away
+    player = Ponderer(AlphaBeta(white=True, depth=8))
+    player._start(Board.start(7).move(Move(Hex(2, 0), Hex(3, 0))))
+    assert player.thread.is_alive()
+    start = time.time()
+    player.stop()
+    assert time.time() - start < 1
+    assert player.result is None
+    # and an unexpected reply stops it too
+    player._start(Board.start(7).move(Move(Hex(2, 0), Hex(3, 0))))
+    board = Board.start(7).move(Move(Hex(2, 0), Hex(3, 0))).move(Move(Hex(4, 6), Hex(3, 6)))
+    player.engine.depth = 2
+    assert player.play(board) in set(board.generate_all_moves(True))
+    assert player.misses == 1
+    player.stop()
+    with pytest.raises(ValueError):
+        Ponderer(Greedy(white=True))
+
+
+def test_async_engine():
+    board = positions()['midgame']
+
+    async def analyse(player, limits=None):
+        return [info async for info in AsyncEngine(player).analyse(board, limits)]
+
+    infos = asyncio.run(analyse(AlphaBeta(white=True, depth=3)))
+    assert [info.depth for info in infos] == [1, 2, 3, 3]
+    assert [info.final for info in infos] == [False, False, False, True]
+    assert infos[-1].move == AlphaBeta(white=True, depth=3).play(board)
+    assert infos[0].nodes < infos[1].nodes < infos[2].nodes
+    infos = asyncio.run(analyse(PVS(white=True, depth=2), Limits(depth=4)))
+    assert infos[-1].depth == 4
+    assert infos[-1].pv[0] == infos[-1].move
+    infos = asyncio.run(analyse(AlphaBeta(white=True), Limits(nodes=2000)))
+    assert infos[-1].nodes >= 2000
+    infos = asyncio.run(analyse(Minimax(white=True, depth=2)))
+    assert [info.depth for info in infos] == [1, 2, 2]
+    assert infos[-1].move == Minimax(white=True, depth=2).play(board)
+    assert infos[-1].nodes == 1 + PERFT['midgame'][0] + 1 + PERFT['midgame'][0] + PERFT['midgame'][1]
+    infos = asyncio.run(analyse(Greedy(white=True)))
+    assert len(infos) == 1
+    assert infos[0].move == Greedy(white=True).play(board)
+    assert asyncio.run(AsyncEngine(Greedy(white=True)).play(board)) == infos[0].move
+    with pytest.raises(ValueError):
+        AsyncEngine(ParallelAlphaBeta(white=True, workers=2))
+
+    async def cancel():
+        task = asyncio.create_task(analyse(AlphaBeta(white=True, depth=20)))
+        await asyncio.sleep(0.2)
+        start = time.time()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return time.time() - start
+
+    assert asyncio.run(cancel()) < 1
+
+
+def test_search_slices():
+    board = positions()['midgame']
+    engine = AlphaBeta(white=True, depth=4)
+    engine.on_iteration = lambda depth, value, move: None # deepen iteratively, as the slices do
+    slices = AlphaBeta(white=True, depth=4).search_slices(board, nodes_per_slice=1000)
+    progress = []
+    with pytest.raises(StopIteration) as done:
+        while True:
+            progress.append(next(slices))
+    assert done.value.value == engine.play(board)
+    assert len(progress) > 1
+    assert [depth for depth, _, _, _ in progress] == sorted(depth for depth, _, _, _ in progress)
+    assert all(nodes >= 1000 * (i + 1) for i, (_, _, _, nodes) in enumerate(progress))
+    ends = [0] + [nodes for _, _, _, nodes in progress]
+    assert all(end - start <= 1000 + 1 for start, end in zip(ends, ends[1:]))
+
+    def run(slices):
+        progress = []
+        with pytest.raises(StopIteration) as done:
+            while True:
+                progress.append(next(slices))
+        return done.value.value, progress
+
+    # the first iteration always finishes, and nothing is reported before it does
+    player = AlphaBeta(white=True, depth=3, node_limit=1)
+    move, progress = run(player.search_slices(Board.start(7), 1))
+    assert move == AlphaBeta(white=True, depth=3, node_limit=1).play(Board.start(7))
+    assert all(value is not None and move is not None for _, value, move, _ in progress)
+    # PVS is searched as PVS, and instrumented players count their slices
+    player = PVS(white=True, depth=4)
+    move, progress = run(player.search_slices(board, 1000))
+    assert move == PVS(white=True, depth=4).play(board)
+    assert player.pv[0] == move
+    player = AlphaBeta(white=True, depth=4, instrument=True)
+    move, progress = run(player.search_slices(board, 1000))
+    assert player.stats.nodes == player.nodes
+
+    reports = []
+    other_task_turns = 0
+
+    async def other_task():
+        nonlocal other_task_turns
+        while True:
+            other_task_turns += 1
+            await asyncio.sleep(0)
+
+    async def search(player):
+        task = asyncio.create_task(other_task())
+        move = await play_cooperatively(player, board, 1000, lambda *args: reports.append(args))
+        task.cancel()
+        return move
+
+    assert asyncio.run(search(AlphaBeta(white=True, depth=4))) == engine.play(board)
+    assert len(reports) == len(progress)
+    assert other_task_turns >= len(reports)
+    assert asyncio.run(search(Greedy(white=True))) == Greedy(white=True).play(board)
+    engine = AlphaBeta(white=True, time_limit=0.2)
+    start = time.time()
+    assert asyncio.run(search(engine)) is not None
+    assert time.time() - start < 1
+
+
+def test_build(tmp_path):
+    config = tmp_path / 'game.json'
+    config.write_text(json.dumps({'title': "Chinese Checkers", 'files': ['geometry.py', 'chinesechequers.py', 'play.py'],
+                                  'main': 'play_web'}))
+    for name in ('geometry.py', 'chinesechequers.py', 'play.py'):
+        (tmp_path / name).write_text(open(name).read())
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    (docs / 'blessed_mock.py').write_text(open('docs/blessed_mock.py').read())
+    version = build(str(config), str(docs))
+    game = json.loads((docs / 'game.json').read_text())
+    assert game['bundle'] == BUNDLE
+    assert game['version'] == version
+    assert game['main'] == 'play_web'
+    with zipfile.ZipFile(docs / BUNDLE) as archive:
+        assert archive.namelist() == ['geometry.py', 'chinesechequers.py', 'play.py', 'blessed_mock.py']
+        assert archive.read('play.py').decode() == open('play.py').read()
+    assert build(str(config), str(docs)) == version # the same sources give the same bundle
+    with zipfile.ZipFile(docs / BUNDLE) as archive:
+        assert len(archive.namelist()) == 4
+    build(str(config), str(docs), bytecode=True)
+    with zipfile.ZipFile(docs / BUNDLE) as archive:
+        assert len([name for name in archive.namelist() if name.endswith('.pyc')]) == 4
+    (tmp_path / 'play.py').write_text(open('play.py').read() + '\n')
+    assert build(str(config), str(docs)) != version
+
+
+def test_bundle_up_to_date():
+    # docs/game.zip is committed, so it has to be rebuilt (python build.py) whenever the sources change
+    game = json.load(open('game.json'))
+    assert bundle_bytes(game['files'] + WEB_FILES, ['.', 'docs']) == open('docs/' + BUNDLE, 'rb').read()
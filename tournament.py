@@ -0,0 +1,220 @@
+import itertools
+import math
+
+from play import *
+
+
+def expected_score(elo):
+    """Return the expected score of a player rated elo points above their opponent"""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo(score):
+    """Return the Elo difference that gives the expected score (between 0 and 1)"""
+    if score <= 0:
+        return float("-inf")
+    if score >= 1:
+        return float("inf")
+    return -400 * math.log10(1 / score - 1)
+
+
+def score_variance(wins, losses, draws):
+    """Return the mean and variance of the score of a game (1 for a win, 0.5 for a draw and 0 for a loss)"""
+    games = wins + losses + draws
+    mean = (wins + draws / 2) / games
+    variance = (wins + draws / 4) / games - mean * mean
+    return mean, variance
+
+
+def elo_difference(wins, losses, draws, z=1.96):
+    """
+    Return the estimated Elo difference between two players from the first player's wins,
+    losses and draws, and the margin of the confidence interval around it (95% for the
+    default z). The margin is infinite if the first player won or lost every game.
+    """
+    games = wins + losses + draws
+    if games == 0:
+        return 0.0, float("inf")
+    mean, variance = score_variance(wins, losses, draws)
+    error = z * math.sqrt(variance / games)
+    if mean - error <= 0 or mean + error >= 1:
+        return elo(mean), float("inf")
+    return elo(mean), (elo(mean + error) - elo(mean - error)) / 2
+
+
+def sprt_bounds(alpha=0.05, beta=0.05):
+    """Return the lower and upper log-likelihood ratio bounds of a SPRT with the given error rates"""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def sprt_llr(wins, losses, draws, elo0, elo1, min_variance=0.01):
+    """
+    Return the log-likelihood ratio of the hypothesis that the first player is elo1 points
+    stronger against the hypothesis that they are elo0 points stronger, using the usual
+    normal approximation to the distribution of the mean score (as in Fishtest). The
+    variance is not allowed below min_variance, so a few one-sided results don't give
+    an infinite ratio.
+    """
+    games = wins + losses + draws
+    if games == 0:
+        return 0.0
+    mean, variance = score_variance(wins, losses, draws)
+    variance = max(variance, min_variance)
+    score0 = expected_score(elo0)
+    score1 = expected_score(elo1)
+    return games * (score1 - score0) * (2 * mean - score0 - score1) / (2 * variance)
+
+
+class Pairing:
+    """The results so far of the games between two players, from player1's point of view."""
+
+    def __init__(self, player1, player2):
+        self.player1 = player1
+        self.player2 = player2
+        self.wins = 0
+        self.losses = 0
+        self.draws = 0
+        self.shortest_game = 100
+        self.llr = 0.0
+        self.decision = None # the stronger player once the SPRT has decided
+
+    @property
+    def games(self):
+        return self.wins + self.losses + self.draws
+
+    def add(self, winner, num_moves, player1_white):
+        """Add the result of a game, as returned by play_game, where player1 was white or black"""
+        if winner == 0:
+            self.draws += 1
+        elif (winner == 1) == player1_white:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.shortest_game = min(self.shortest_game, num_moves)
+
+    def elo_difference(self):
+        return elo_difference(self.wins, self.losses, self.draws)
+
+    def __str__(self):
+        difference, margin = self.elo_difference()
+        return "{} - {}, {}, {}, {}, {}, Elo {:+.0f} +/- {:.0f}, LLR {:.2f}{}".format(
+            self.player1, self.player2, self.wins, self.losses, self.draws, self.shortest_game,
+            difference, margin, self.llr, ", " + str(self.decision) + " stronger" if self.decision else "")
+
+
+class Tournament:
+    """
+    A round robin that stops each pairing as soon as a sequential probability ratio test
+    (SPRT) has decided which of the two players is stronger.
+
+    The test for each pairing is between player1 being elo_bound points weaker and being
+    elo_bound points stronger, with error rates alpha and beta. Games are played in rounds:
+    in each round every undecided pairing plays two games, one with each player as white,
+    so lopsided pairings stop after a few rounds and the rest of the game budget goes to
+    the close ones. Games are played as play_round_robin_parallel, with fresh copies of
+    the players and a seed per game, on the given number of worker processes, and a game
+    is drawn as soon as a position occurs repetitions times (None to play on to the move
+    limit), so games stuck in a loop don't use up the budget.
+    """
+
+    def __init__(self, players, size=7, elo_bound=100, alpha=0.05, beta=0.05, min_games=4,
+                 time_control=None, workers=None, seed=0, repetitions=3):
+        self.players = players
+        self.size = size
+        self.elo_bound = elo_bound
+        self.lower, self.upper = sprt_bounds(alpha, beta)
+        self.min_games = min_games
+        self.workers = workers
+        self.seed = seed
+        self.repetitions = repetitions
+        self.games_played = 0
+        set_time_control(players, time_control)
+        self.pairings = [Pairing(player1, player2) for player1, player2 in itertools.combinations(players, 2)]
+
+    def undecided(self):
+        return [pairing for pairing in self.pairings if pairing.decision is None]
+
+    def play_round(self, budget):
+        """Play a round of at most budget games, and return the number played"""
+        pairings = self.undecided()[:budget // 2]
+        seeds = game_seeds(self.seed + self.games_played, len(pairings) * 2)
+        tasks = []
+        for pairing, seed1, seed2 in zip(pairings, seeds[0::2], seeds[1::2]):
+            tasks.append((pairing.player1, pairing.player2, self.size, seed1, self.repetitions))
+            tasks.append((pairing.player2, pairing.player1, self.size, seed2, self.repetitions))
+        results = play_games(tasks, self.workers)
+        for i, pairing in enumerate(pairings):
+            pairing.add(*results[2 * i], player1_white=True)
+            pairing.add(*results[2 * i + 1], player1_white=False)
+            self._test(pairing)
+        self.games_played += len(tasks)
+        return len(tasks)
+
+    def _test(self, pairing):
+        pairing.llr = sprt_llr(pairing.wins, pairing.losses, pairing.draws, -self.elo_bound, self.elo_bound)
+        if pairing.games < self.min_games:
+            return
+        if pairing.llr >= self.upper:
+            pairing.decision = pairing.player1
+        elif pairing.llr <= self.lower:
+            pairing.decision = pairing.player2
+
+    def run(self, games):
+        """Play until every pairing is decided or the budget of games runs out, and return the pairings"""
+        budget = games
+        while budget >= 2 and self.undecided():
+            budget -= self.play_round(budget)
+        return self.pairings
+
+    def ratings(self, iterations=100):
+        """
+        Return a dict from each player to their Elo rating, relative to an average of 0,
+        fitted to all the games played (by the minorization-maximization algorithm for the
+        Bradley-Terry model, counting a draw as half a win each).
+        """
+        strengths = {player: 1.0 for player in self.players}
+        for _ in range(iterations):
+            new_strengths = {}
+            for player in self.players:
+                score = 0.0
+                total = 0.0
+                for pairing in self.pairings:
+                    if player is pairing.player1:
+                        opponent, wins = pairing.player2, pairing.wins + pairing.draws / 2
+                    elif player is pairing.player2:
+                        opponent, wins = pairing.player1, pairing.losses + pairing.draws / 2
+                    else:
+                        continue
+                    score += wins
+                    total += pairing.games / (strengths[player] + strengths[opponent])
+                # keep players who won (or lost) every game at a finite rating
+                new_strengths[player] = max(score, 0.5) / total if total else 1.0
+            strengths = new_strengths
+        mean = sum(400 * math.log10(strength) for strength in strengths.values()) / len(strengths)
+        return {player: 400 * math.log10(strength) - mean for player, strength in strengths.items()}
+
+
+def play_tournament(players, games=100, size=7, elo_bound=100, time_control=None, workers=None, seed=0):
+    """
+    Play a tournament between the players with a budget of the given total number of games,
+    print the results and ratings, and return the tournament.
+    """
+    tournament = Tournament(players, size, elo_bound, time_control=time_control, workers=workers, seed=seed)
+    tournament.run(games)
+    print_tournament(tournament)
+    return tournament
+
+
+def print_tournament(tournament):
+    print()
+    for pairing in tournament.pairings:
+        print(pairing)
+    ratings = tournament.ratings()
+    for player in sorted(ratings, key=ratings.get, reverse=True):
+        print("{}: {:+.0f}".format(player, ratings[player]))
+    print("{} games".format(tournament.games_played))
+
+
+if __name__ == '__main__':
+    play_tournament([Random(white=True), Greedy(white=True, randomize=True), Minimax(white=True, depth=2, randomize=True),
+                     AlphaBeta(white=True, depth=3)], games=200)